@@ -0,0 +1,297 @@
+# Infraestructura común de las aplicaciones de Streamlit (app.py y mistral.py): llamadas al modelo,
+# historial de la sesión, cachés compartidas, ejecución de los simuladores, exportación, perfilado y
+# diagnóstico. Las funciones que consultan al modelo reciben el modelo de la aplicación como primer
+# argumento; cada aplicación las fija con functools.partial.
+import os
+import tracemalloc
+import uuid
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import openrouter
+import planner
+from estimates import EstimateStore
+from exporters import EXPORT_FORMATS, export_file_name, export_runs, make_run
+from memory_governor import MemoryGovernor, current_rss, top_allocations
+from rerun_profiler import PROFILE_MODES, RerunProfile, trace_file_name
+from similarity_cache import SimilarityCache
+from simulators import build_prompt, extract_for_simulator
+from validation import answer_problems, validate_and_reask
+
+# Configuración de la clave API desde OPENROUTER_API_KEY o los secretos de Streamlit (no se necesita al reproducir grabaciones)
+API_KEY = "" if openrouter.TRANSPORT_MODE == "replay" else os.environ.get("OPENROUTER_API_KEY") or st.secrets["OPENROUTER_API_KEY"]
+
+# Función para llamar a la API de OpenRouter con el modelo de la aplicación como tráfico interactivo de
+# la sesión; devuelve (texto, modelo que respondió) o lanza OpenRouterError. Si la petición tiene que esperar turno se muestra su posición en la
+# cola (solo desde el hilo del script; las partes en paralelo esperan sin aviso propio)
+def call_openrouter(model, prompt, simulator=None, session_id=None):
+    notice = []
+    def show_position(position, depth):
+        if not notice:
+            notice.append(st.empty())
+        notice[0].info(f"Hay muchas consultas en curso: tu consulta es la número {position} de {depth} en la cola y se enviará en cuanto haya turno.")
+    try:
+        return openrouter.call_openrouter(
+            prompt, model, API_KEY, simulator, user=session_id or st.session_state.session_id,
+            on_wait=show_position if get_script_run_ctx(suppress_warning=True) else None
+        )
+    finally:
+        if notice:
+            notice[0].empty()
+
+# Muestra un error de la API como aviso, en lugar de mostrarlo como recomendación
+def show_api_error(error):
+    st.error(str(error))
+    details = [f"tipo: {error.kind}"]
+    if error.model:
+        details.append(f"modelo: {error.model}")
+    if error.attempts:
+        details.append(f"intentos: {error.attempts}")
+    if error.elapsed is not None:
+        details.append(f"tiempo: {error.elapsed:.1f} s")
+    st.caption(" · ".join(details))
+
+# Control de memoria compartido por todas las sesiones del proceso: guarda el historial de cada
+# sesión con presupuestos de bytes y descarta las sesiones inactivas
+@st.cache_resource
+def get_memory_governor():
+    return MemoryGovernor()
+
+# Historial de ejecuciones de la sesión (para exportar)
+def session_history():
+    return get_memory_governor().items(st.session_state.session_id)
+
+# Guarda una ejecución en el historial de la sesión
+def record_run(model, simulator, prompt, result, data):
+    timestamp = datetime.now().isoformat(timespec="seconds")
+    run = make_run(uuid.uuid4().hex, timestamp, simulator, model, prompt, result, data)
+    get_memory_governor().add(st.session_state.session_id, run["run_id"], run)
+
+# Caché por similitud compartida por todas las sesiones del proceso (se activa en la barra lateral)
+@st.cache_resource
+def get_similarity_cache():
+    return SimilarityCache(threshold=float(os.environ.get("SIMILARITY_CACHE_THRESHOLD", 0.8)))
+
+# Re-consulta corta para corregir las cifras de una respuesta; si falla se conserva la respuesta original
+def call_reask(model, prompt, simulator):
+    try:
+        return call_openrouter(model, prompt, openrouter.latency_key(simulator, "reask"))[0]
+    except openrouter.OpenRouterError:
+        return ""
+
+# Aviso cuando respondió un modelo de respaldo en lugar del modelo de la aplicación
+def show_fallback(model, used_models):
+    fallbacks = sorted(set(used_models) - {model})
+    if fallbacks:
+        st.caption(f"Respondió el modelo de respaldo {', '.join(fallbacks)} porque {model} no respondió a tiempo o no estaba disponible; la ejecución se registra con el modelo que respondió.")
+
+# Estimaciones por canal compartidas entre simuladores para el mismo producto (se activa en la barra lateral)
+@st.cache_resource
+def get_estimate_store():
+    return EstimateStore()
+
+# Llama a la API (o reutiliza una consulta similar o las estimaciones de otros simuladores), valida las
+# cifras de la respuesta (con una re-consulta corta si no sirven) y registra la ejecución
+def run_simulator(model, simulator, prompt):
+    cache = get_similarity_cache() if st.session_state.get("use_similarity_cache") else None
+    estimates = get_estimate_store() if st.session_state.get("use_shared_estimates") else None
+    accept = lambda result: not answer_problems(simulator, prompt, result, extract_for_simulator(simulator, result))
+    cached = cache.get(model, simulator, prompt, accept) if cache is not None else None
+    local = estimates.local_answer(model, simulator, prompt) if estimates is not None and not cached else None
+    sent_prompt, used_model = prompt, model
+    if cached:
+        result, similarity = cached
+        st.caption(f"Resultado reutilizado de una consulta similar (similitud {similarity:.0%}).")
+    elif local:
+        result, old_goal = local
+        st.caption(f"Calculado localmente: se muestra la recomendación anterior de este simulador (objetivo {old_goal:,.0f}) con sus cifras reescaladas al nuevo objetivo, sin consultar al modelo.")
+    else:
+        context = estimates.context(model, simulator, prompt) if estimates is not None else ""
+        if context:
+            st.caption("Se incluyeron en la consulta las estimaciones por canal de otros simuladores para este producto.")
+        sent_prompt = prompt + context
+        answer, used_model = call_openrouter(model, sent_prompt, simulator)
+        show_fallback(model, [used_model])
+        result, _, problems = validate_and_reask(simulator, prompt, answer, lambda reask: call_reask(model, reask, simulator))
+        if result is not answer:
+            st.caption("Las cifras de la respuesta no se podían usar; se volvieron a pedir en formato estricto con una consulta corta.")
+        elif problems:
+            st.caption("Las cifras no pasaron la validación: " + "; ".join(problems) + ".")
+        if cache is not None:
+            cache.put(used_model, simulator, prompt, result)
+    data = extract_for_simulator(simulator, result)
+    # Las respuestas locales no se registran: se derivan de una ya registrada
+    if estimates is not None and not local:
+        estimates.record(used_model, simulator, prompt, data, result)
+    record_run(used_model, simulator, sent_prompt, result, data)
+    return result
+
+# Modo por partes: ejecuta los sub-prompts en paralelo y devuelve (texto combinado, datos combinados). Si
+# alguna parte la respondió un modelo de respaldo, la ejecución se registra con todos los que respondieron
+def run_simulator_plan(model, simulator, product, **goals):
+    session_id, key = st.session_state.session_id, openrouter.latency_key(simulator, "parte")
+    used_models = set()
+    def call_part(prompt):
+        text, used_model = call_openrouter(model, prompt, key, session_id)
+        used_models.add(used_model)
+        return text
+    result, data, prompts = planner.run_plan(simulator, product, call_part, **goals)
+    show_fallback(model, used_models)
+    used_model = " + ".join(sorted(used_models))
+    if st.session_state.get("use_shared_estimates"):
+        get_estimate_store().record(used_model, simulator, build_prompt(simulator, product, **goals), data, result)
+    record_run(used_model, simulator, "\n\n".join(prompts), result, data)
+    return result, data
+
+# Perfilado opcional de cada ejecución (?perfil=cprofile|muestreo o variable PROFILE_RERUNS); se guardan
+# los últimos PROFILE_TRACES rastros de la sesión
+def start_profile(label):
+    mode = st.session_state.profile_mode
+    if mode and st.session_state.active_profile is None:
+        st.session_state.active_profile = RerunProfile(mode, label)
+        return True
+    return False
+
+def finish_profile():
+    profile = st.session_state.active_profile
+    if profile is not None:
+        st.session_state.active_profile = None
+        st.session_state.profile_traces.append(profile.stop())
+
+# Inicio de cada ejecución completa del script: transporte de la API, estado de la sesión, perfilado y
+# contadores por sesión de ejecuciones completas y del área del simulador (ver ?diagnostico=1). Un
+# transporte mal configurado (grabación faltante en modo replay, modo desconocido) detiene la aplicación
+# con el error en lugar de fallar en el primer cálculo
+def start_script():
+    try:
+        openrouter.get_transport()
+    except openrouter.OpenRouterError as e:
+        show_api_error(e)
+        st.stop()
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "profile_traces" not in st.session_state:
+        st.session_state.profile_traces = deque(maxlen=int(os.environ.get("PROFILE_TRACES", 20)))
+        st.session_state.active_profile = None
+    st.session_state.profile_mode = PROFILE_MODES.get(st.query_params.get("perfil") or os.environ.get("PROFILE_RERUNS", ""))
+    # Cierra un perfil que haya quedado abierto si la ejecución anterior se interrumpió
+    finish_profile()
+    start_profile("script")
+    if "script_runs" not in st.session_state:
+        st.session_state.script_runs = 0
+        st.session_state.fragment_runs = 0
+    st.session_state.script_runs += 1
+
+# Opciones de la barra lateral que comparten las aplicaciones
+def sidebar_options():
+    st.sidebar.checkbox(
+        "Reutilizar resultados de consultas similares",
+        value=os.environ.get("SIMILARITY_CACHE") == "1",
+        key="use_similarity_cache",
+        help="Evita una nueva consulta cuando ya se calculó algo casi igual (mismo simulador y objetivos redondeados, textos parecidos)."
+    )
+    st.sidebar.checkbox(
+        "Compartir estimaciones entre simuladores",
+        value=os.environ.get("SHARED_ESTIMATES") == "1",
+        key="use_shared_estimates",
+        help="Reutiliza las cifras por canal (alcance, unidades, inversión) ya calculadas para este producto: al cambiar solo el objetivo se reescalan sin consultar al modelo, y en otros simuladores se incluyen en la consulta para que los números sean coherentes."
+    )
+
+# Exportación del resultado actual o del historial de la sesión (fragmento propio para que
+# cambiar el formato no borre la recomendación mostrada)
+@st.fragment
+def export_area():
+    history = session_history()
+    if history:
+        with st.expander("Exportar resultados", expanded=False):
+            export_scope = st.radio("Contenido", ["Resultado actual", "Historial de la sesión"], horizontal=True)
+            export_format = st.selectbox("Formato", list(EXPORT_FORMATS))
+            runs = history[-1:] if export_scope == "Resultado actual" else history
+            st.download_button(
+                f"Descargar {export_format}",
+                data=lambda: export_runs(runs, export_format),
+                file_name=export_file_name("resultado" if export_scope == "Resultado actual" else "historial", export_format),
+                mime=EXPORT_FORMATS[export_format][1],
+                help="El archivo se genera al hacer clic."
+            )
+
+# Área del simulador; render(selected_simulator, product) dibuja el simulador de la aplicación. Se ejecuta
+# como fragmento: enviar un formulario del simulador solo reejecuta esta área y no todo el script
+@st.fragment
+def simulator_area(render, selected_simulator, product):
+    st.session_state.fragment_runs += 1
+    profiled = start_profile("simulador")
+    try:
+        render(selected_simulator, product)
+    except openrouter.OpenRouterError as e:
+        show_api_error(e)
+    finally:
+        if profiled:
+            finish_profile()
+    export_area()
+
+# Diagnóstico de memoria del proceso (visible con ?diagnostico=1)
+def memory_diagnostics():
+    with st.expander("Diagnóstico de memoria", expanded=True):
+        stats = get_memory_governor().stats()
+        cache = get_similarity_cache()
+        estimates = get_estimate_store()
+        rss = current_rss()
+        cols = st.columns(5)
+        cols[0].metric("RSS del proceso", f"{rss / 1024 / 1024:.1f} MB" if rss else "N/D")
+        cols[1].metric("Historiales", f"{stats['bytes'] / 1024 / 1024:.2f} MB", f"{stats['sesiones']} sesiones", delta_color="off")
+        cols[2].metric("Caché por similitud", f"{cache.bytes / 1024 / 1024:.2f} MB", f"{len(cache)} entradas", delta_color="off")
+        cols[3].metric("Estimaciones compartidas", f"{estimates.bytes / 1024 / 1024:.2f} MB", f"{len(estimates)} productos", delta_color="off")
+        cols[4].metric("Desalojos", stats["desalojos"], f"{stats['sesiones_expiradas']} sesiones expiradas", delta_color="off")
+        if tracemalloc.is_tracing():
+            if st.button("Detener tracemalloc"):
+                tracemalloc.stop()
+                st.rerun()
+            st.dataframe(pd.DataFrame(top_allocations()), use_container_width=True)
+        elif st.button("Iniciar tracemalloc", help="Registra las asignaciones de memoria del proceso; tiene costo de rendimiento."):
+            tracemalloc.start()
+            st.rerun()
+
+# Cola de peticiones al modelo compartida por el proceso (visible con ?diagnostico=1)
+def queue_diagnostics():
+    with st.expander("Cola de peticiones", expanded=True):
+        stats = openrouter.SCHEDULER.stats()
+        st.caption(f"Peticiones en curso: {stats['en_curso']} de {stats['capacidad']}")
+        if stats["compartidos"]:
+            shared = stats["compartidos"]
+            st.caption(f"Cupos compartidos entre procesos: {shared['cupos']} en {shared['directorio']}, {shared['reservados']} reservados al tráfico interactivo")
+        st.dataframe(pd.DataFrame(stats["prioridades"]), use_container_width=True)
+
+def diagnostics():
+    if "diagnostico" in st.query_params:
+        memory_diagnostics()
+        queue_diagnostics()
+
+# Rastros de perfilado de la sesión, descargables como pstats o pilas colapsadas
+def profile_panel():
+    traces = list(st.session_state.profile_traces)
+    with st.expander("Perfiles de ejecución", expanded=True):
+        if not traces:
+            st.info("Aún no hay rastros; se guardan al terminar cada ejecución.")
+            return
+        st.dataframe(pd.DataFrame([
+            {"hora": t["timestamp"], "ejecución": t["label"], "modo": t["mode"], "duración (ms)": t["duration"] * 1000}
+            for t in traces
+        ]), use_container_width=True)
+        index = st.selectbox("Rastro", range(len(traces)), index=len(traces) - 1, format_func=lambda i: f"{traces[i]['timestamp']} · {traces[i]['label']}")
+        trace = traces[index]
+        st.dataframe(pd.DataFrame(trace["top"]), use_container_width=True)
+        st.download_button(
+            "Descargar rastro", data=trace["data"], file_name=trace_file_name(trace),
+            mime="application/octet-stream", on_click="ignore"
+        )
+
+# Fin de cada ejecución completa del script: cierra su perfil y muestra los rastros si el perfilado está activo
+def finish_script():
+    finish_profile()
+    if st.session_state.profile_mode:
+        profile_panel()
@@ -0,0 +1,171 @@
+# Estimaciones compartidas entre simuladores: guarda por producto las cifras por canal que ya calculó un
+# simulador (alcance, unidades, inversión) y las reutiliza en los siguientes. Si se repite un simulador
+# cambiando solo su objetivo, se reutiliza la recomendación anterior sin consultar al modelo y se le
+# agregan sus cifras reescaladas al nuevo objetivo, marcadas como estimación; en los demás casos las
+# estimaciones conocidas (y los costos derivados) se añaden al prompt. Como guarda las respuestas completas,
+# se limita por número de productos y por bytes aproximados (se descartan los productos usados hace más tiempo).
+import sys
+import threading
+from collections import OrderedDict
+
+from similarity_cache import normalize_text, to_number
+from simulators import ESTIMATE_HEADING, extract_data_for_table_and_chart, parse_prompt
+
+# Magnitud que estima cada simulador y el objetivo del prompt con el que se reescalan sus cifras.
+# Publicidad Offline no se incluye: sus líneas ("TV: $2000 para 50000 personas") mezclan monto y alcance,
+# y el extractor toma el monto
+QUANTITIES = {
+    "Marketing de Influencers": ("alcance", "reach_goal"),
+    "Lanzamiento de Producto": ("unidades", "adoption_goal"),
+    "Eventos y Promociones": ("unidades", "sales_goal"),
+    "Gestión de Presupuesto Total": ("inversión", "total_budget"),
+    "Inversión en Plataformas Digitales": ("inversión", "budget_limit"),
+}
+
+PRODUCT_FIELDS = ("product_name", "product_category", "target_audience", "unique_feature", "price", "locality")
+
+def format_quantity(quantity, value):
+    if quantity == "inversión":
+        return f"${value:,.2f}"
+    return f"{value:,.0f} {'personas' if quantity == 'alcance' else 'unidades'}"
+
+# Costos y tasas que se deducen de un canal con varias magnitudes conocidas
+def derived_ratios(known):
+    ratios = []
+    if known.get("inversión") and known.get("alcance"):
+        ratios.append(f"costo por persona alcanzada ${known['inversión'] / known['alcance']:,.4f}")
+    if known.get("inversión") and known.get("unidades"):
+        ratios.append(f"costo por unidad ${known['inversión'] / known['unidades']:,.2f}")
+    if known.get("unidades") and known.get("alcance"):
+        ratios.append(f"conversión {known['unidades'] / known['alcance']:.2%}")
+    return ratios
+
+# Bytes aproximados de las estimaciones de un producto: textos de las respuestas guardadas y de los canales
+def product_size(product):
+    size = sys.getsizeof(product["channels"]) + sys.getsizeof(product["runs"])
+    for channel in product["channels"].values():
+        size += sys.getsizeof(channel) + sum(sys.getsizeof(value) for value in channel.values())
+    for others, _, data, result in product["runs"].values():
+        size += sys.getsizeof(data) + sum(sys.getsizeof(label) for label in data) + sys.getsizeof(result)
+        size += sum(sys.getsizeof(value) for _, value in others)
+    return size
+
+class EstimateStore:
+    def __init__(self, max_products=500, max_bytes=16 * 1024 * 1024):
+        self.max_products = max_products
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # clave del producto -> {"channels": {canal normalizado: {"label", magnitud -> (valor, objetivo, simulador)}},
+        #                        "runs": {simulador: (otros campos, objetivo, datos, resultado)}}
+        self.products = OrderedDict()
+        self.sizes = {}  # clave del producto -> bytes aproximados
+        self.bytes = 0
+        self.local_answers = 0
+        self.injected = 0
+
+    # Separa los campos del prompt en (clave del producto, objetivo, demás campos); None si no aplica
+    def split(self, model, simulator, prompt):
+        if simulator not in QUANTITIES:
+            return None
+        fields = parse_prompt(simulator, prompt)
+        if fields is None:
+            return None
+        goal = to_number(fields[QUANTITIES[simulator][1]])
+        if not goal:
+            return None
+        key = (model,) + tuple(normalize_text(fields[name]) for name in PRODUCT_FIELDS)
+        others = tuple(sorted((name, value) for name, value in fields.items() if name not in PRODUCT_FIELDS and name != QUANTITIES[simulator][1]))
+        return key, goal, others
+
+    def record(self, model, simulator, prompt, data, result=None):
+        parts = self.split(model, simulator, prompt)
+        if parts is None or not data:
+            return
+        key, goal, others = parts
+        quantity = QUANTITIES[simulator][0]
+        with self.lock:
+            product = self.products.setdefault(key, {"channels": {}, "runs": {}})
+            self.products.move_to_end(key)
+            for label, value in data.items():
+                channel = product["channels"].setdefault(normalize_text(label), {"label": label.strip()})
+                channel[quantity] = (value, goal, simulator)
+            product["runs"][simulator] = (others, goal, dict(data), result)
+            size = product_size(product)
+            self.bytes += size - self.sizes.get(key, 0)
+            self.sizes[key] = size
+            while len(self.products) > self.max_products or (self.bytes > self.max_bytes and len(self.products) > 1):
+                evicted, _ = self.products.popitem(last=False)
+                self.bytes -= self.sizes.pop(evicted)
+
+    # Respuesta calculada sin el modelo cuando el simulador ya corrió para el producto con los mismos
+    # campos salvo el objetivo: la recomendación anterior seguida de sus cifras reescaladas
+    # proporcionalmente bajo ESTIMATE_HEADING; devuelve (texto, objetivo anterior) o None
+    def local_answer(self, model, simulator, prompt):
+        parts = self.split(model, simulator, prompt)
+        if parts is None:
+            return None
+        key, goal, others = parts
+        with self.lock:
+            product = self.products.get(key)
+            run = product["runs"].get(simulator) if product else None
+            if run is None or run[0] != others or not run[3]:
+                return None
+            self.products.move_to_end(key)
+            self.local_answers += 1
+        _, old_goal, data, result = run
+        factor = goal / old_goal
+        weeks = {}
+        if simulator == "Inversión en Plataformas Digitales":
+            weeks = {row["Plataforma"]: row["Semanas"] for row in extract_data_for_table_and_chart(result) or []}
+        lines = []
+        for label, value in data.items():
+            value *= factor
+            if QUANTITIES[simulator][0] == "inversión":
+                line = f"{label.strip()}: ${value:.2f}" + (f" por {weeks[label.strip()]:g} semanas" if weeks.get(label.strip()) else "")
+            else:
+                line = f"{label.strip()}: {value:.0f}"
+            lines.append(line)
+        note = (
+            f"**Nota:** esta recomendación se calculó para un objetivo de {old_goal:,.0f}. Las cifras siguientes se "
+            f"reescalaron proporcionalmente al nuevo objetivo de {goal:,.0f} sin consultar al modelo; suponen que "
+            "los resultados crecen en proporción al objetivo, así que tómalas solo como una estimación."
+        )
+        return f"{result}\n\n{note}\n\n{ESTIMATE_HEADING}\n\n" + "\n".join(lines), old_goal
+
+    # Texto para añadir al prompt con las estimaciones de otros simuladores para el mismo producto
+    # (las de la misma magnitud, reescaladas al objetivo actual); "" si no hay ninguna
+    def context(self, model, simulator, prompt):
+        parts = self.split(model, simulator, prompt)
+        if parts is None:
+            return ""
+        key, goal, _ = parts
+        quantity = QUANTITIES[simulator][0]
+        with self.lock:
+            product = self.products.get(key)
+            channels = [dict(channel) for channel in product["channels"].values()] if product else []
+        lines = []
+        for channel in channels:
+            estimates, known = [], {}
+            for name in ("alcance", "unidades", "inversión"):
+                if name not in channel or channel[name][2] == simulator:
+                    continue
+                value, source_goal, source = channel[name]
+                known[name] = value
+                if name == quantity:
+                    estimates.append(f"{name} {format_quantity(name, value * goal / source_goal)} para este objetivo (según {source})")
+                else:
+                    estimates.append(f"{name} {format_quantity(name, value)} (según {source})")
+            if estimates:
+                lines.append(f"- {channel['label']}: " + "; ".join(estimates + derived_ratios(known)))
+        if not lines:
+            return ""
+        with self.lock:
+            self.injected += 1
+        return (
+            "\n\nEstimaciones previas por canal para este mismo producto:\n" + "\n".join(lines) +
+            "\nParte de estas cifras en lugar de recalcularlas desde cero para que los resultados sean coherentes, "
+            "ajústalas solo si el objetivo lo requiere y sé breve al justificarlas."
+        )
+
+    def __len__(self):
+        return len(self.products)
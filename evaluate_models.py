@@ -0,0 +1,149 @@
+# Evaluación comparativa de modelos sobre todos los simuladores.
+# Ejecuta un conjunto fijo de productos por cada simulador y modelo en paralelo, y reporta
+# latencia, tokens, tasa de extracción de datos y consistencia numérica entre repeticiones.
+# Uso: python evaluate_models.py --repeats 3 --workers 8            (endpoint simulado local)
+#      OPENROUTER_API_KEY=... python evaluate_models.py --api-url https://openrouter.ai/api/v1/chat/completions
+#      python evaluate_models.py --mode replay --cassette cassettes/eval.jsonl.gz   (respuestas grabadas)
+#      python evaluate_models.py --store runs/   (agrega las ejecuciones al almacén compacto, ver run_store.py)
+import argparse
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+import openrouter
+from exporters import WRITERS, export_format_for, make_run
+from run_store import RunStore
+from simulators import DEFAULT_GOALS, build_prompt, extract_for_simulator
+
+# Productos de referencia usados en todas las evaluaciones
+FIXTURES = [
+    {"product_name": "Café Premium", "product_category": "Alimentos", "target_audience": "Jóvenes de 18-35 años",
+     "unique_feature": "Sostenibilidad", "price": 10.0, "locality": "México"},
+    {"product_name": "App de Finanzas", "product_category": "Tecnología", "target_audience": "Profesionales de 25-45 años",
+     "unique_feature": "Ahorro automático", "price": 4.99, "locality": "Global"},
+    {"product_name": "Zapatillas Urbanas", "product_category": "Moda", "target_audience": "Estudiantes universitarios",
+     "unique_feature": "Materiales reciclados", "price": 60.0, "locality": "Colombia"},
+]
+
+# Ejecuta una llamada y devuelve sus métricas; la llamada pasa por la cola como tráfico de lote, así contra
+# la API real ocupa solo los cupos compartidos que no están reservados a las sesiones interactivas de la
+# aplicación (ver scheduler.SharedSlots)
+def run_case(model, fixture_index, simulator, api_key, api_url, timeout):
+    prompt = build_prompt(simulator, FIXTURES[fixture_index], **DEFAULT_GOALS[simulator])
+    with openrouter.SCHEDULER.slot("lote", "evaluate_models"):
+        start = time.perf_counter()
+        try:
+            response = openrouter.request_completion(prompt, model, api_key, api_url, timeout)
+            text = response["choices"][0]["message"]["content"]
+            usage = response.get("usage", {})
+            error = None
+        except (requests.exceptions.RequestException, openrouter.CassetteMissError, KeyError, IndexError) as e:
+            text, usage, error = "", {}, str(e)
+        latency = time.perf_counter() - start
+    data = extract_for_simulator(simulator, text) if text else None
+    return {
+        "model": model, "fixture": fixture_index, "simulator": simulator, "latency": latency,
+        "prompt_tokens": usage.get("prompt_tokens", 0), "completion_tokens": usage.get("completion_tokens", 0),
+        "error": error, "extracted": data is not None, "total": sum(data.values()) if data else None,
+        "prompt": prompt, "result": text, "data": data,
+    }
+
+# Consistencia: 1 - coeficiente de variación del total extraído entre repeticiones del mismo caso
+def consistency(group):
+    scores = []
+    for _, case in group.groupby(["fixture", "simulator"]):
+        totals = case["total"].dropna()
+        if len(totals) >= 2 and totals.mean() > 0:
+            scores.append(max(0.0, 1 - statistics.pstdev(totals) / totals.mean()))
+    return statistics.mean(scores) if scores else None
+
+def summarize(results, by=("model",)):
+    rows = []
+    for key, group in results.groupby(list(by)):
+        key = key if isinstance(key, tuple) else (key,)
+        charted = group[group["simulator"] != "Crisis de Marca"]
+        row = dict(zip(by, key))
+        row.update({
+            "llamadas": len(group),
+            "errores": int(group["error"].notna().sum()),
+            "latencia_p50": group["latency"].quantile(0.5),
+            "latencia_p95": group["latency"].quantile(0.95),
+            "tokens_prompt": group["prompt_tokens"].mean(),
+            "tokens_respuesta": group["completion_tokens"].mean(),
+            "extraccion_ok": charted["extracted"].mean(),
+            "consistencia": consistency(charted),
+        })
+        rows.append(row)
+    return pd.DataFrame(rows).sort_values("latencia_p50")
+
+def run_evaluation(models, api_key, api_url, repeats=3, workers=8, timeout=60, simulators=None):
+    simulators = simulators or list(DEFAULT_GOALS)
+    cases = [
+        (model, fixture_index, simulator)
+        for model in models
+        for fixture_index in range(len(FIXTURES))
+        for simulator in simulators
+        for _ in range(repeats)
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_case, *case, api_key, api_url, timeout) for case in cases]
+        return pd.DataFrame([future.result() for future in futures])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluación comparativa de modelos para los simuladores")
+    parser.add_argument("--models", nargs="+", default=[openrouter.QWEN_MODEL, openrouter.MISTRAL_MODEL])
+    parser.add_argument("--api-url", help="Endpoint de chat; si se omite se usa el endpoint simulado local")
+    parser.add_argument("--latency-scale", type=float, default=0.1, help="Escala de latencia del endpoint simulado")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--by-simulator", action="store_true", help="Desglosa el reporte por simulador")
+    parser.add_argument("--csv", help="Guarda las métricas individuales en un CSV")
+    parser.add_argument("--export", help="Exporta las respuestas y datos extraídos (extensión: csv, jsonl, parquet o xlsx)")
+    parser.add_argument("--store", help="Agrega las respuestas y datos extraídos al almacén compacto de este directorio")
+    parser.add_argument("--mode", choices=["passthrough", "record", "replay"], default=openrouter.TRANSPORT_MODE)
+    parser.add_argument("--cassette", default=openrouter.CASSETTE_PATH, help="Archivo de grabaciones para record/replay")
+    args = parser.parse_args()
+    # La extensión de --export se valida antes de la evaluación, no al terminarla
+    export_format = export_format_for(args.export) if args.export else None
+    if args.export and export_format is None:
+        parser.error(f"--export: extensión no soportada en '{args.export}' (usa .csv, .jsonl, .parquet o .xlsx)")
+
+    try:
+        openrouter.set_transport(openrouter.make_transport(args.mode, args.cassette))
+    except openrouter.OpenRouterError as e:
+        parser.error(str(e))
+    api_url = args.api_url or openrouter.API_URL
+    if not args.api_url and args.mode != "replay":
+        from mock_openrouter import start_mock_server
+        server, api_url = start_mock_server(latency_scale=args.latency_scale)
+    api_key = os.environ.get("OPENROUTER_API_KEY", "mock")
+    # En el proceso no hay tráfico interactivo: la concurrencia propia la fija --workers, y contra la API real
+    # los cupos compartidos con la aplicación la acotan. El endpoint simulado y las grabaciones no gastan
+    # la cuota, así que no ocupan cupos
+    openrouter.SCHEDULER.max_concurrent = max(openrouter.SCHEDULER.max_concurrent, args.workers)
+    if not args.api_url:
+        openrouter.SCHEDULER.shared = None
+
+    results = run_evaluation(args.models, api_key, api_url, args.repeats, args.workers, args.timeout)
+    if args.csv:
+        results.drop(columns=["prompt", "result", "data"]).to_csv(args.csv, index=False)
+    # Identificadores únicos por ejecución para que varias evaluaciones puedan ir al mismo almacén
+    batch, timestamp = uuid.uuid4().hex[:8], datetime.now().isoformat(timespec="seconds")
+    runs = [
+        make_run(f"{batch}-{index}", timestamp, case["simulator"], case["model"], case["prompt"], case["result"], case["data"])
+        for index, case in enumerate(results.to_dict("records"))
+    ]
+    if args.export:
+        with open(args.export, "wb") as f:
+            WRITERS[export_format](runs, f)
+    if args.store:
+        RunStore(args.store).append(runs)
+    report = summarize(results, ("model", "simulator") if args.by_simulator else ("model",))
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
@@ -0,0 +1,97 @@
+# Exportación de resultados de los simuladores en CSV, JSONL, Parquet y XLSX.
+# Los escritores procesan las filas por bloques y escriben a un archivo temporal que pasa a disco
+# cuando crece, así exportar miles de ejecuciones no arma tablas intermedias en memoria; el archivo
+# terminado se devuelve como bytes, que es lo que st.download_button acepta de una función diferida.
+import csv
+import io
+import itertools
+import json
+import os
+import tempfile
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+# Columnas de las exportaciones tabulares (una fila por dato extraído de cada ejecución)
+ROW_COLUMNS = ["run_id", "timestamp", "simulator", "model", "label", "value", "result"]
+
+CHUNK_SIZE = 1000
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Crea el registro de una ejecución; data es el diccionario etiqueta -> valor extraído (o None)
+def make_run(run_id, timestamp, simulator, model, prompt, result, data):
+    return {
+        "run_id": run_id, "timestamp": timestamp, "simulator": simulator, "model": model,
+        "prompt": prompt, "result": result, "data": data or {},
+    }
+
+# Aplana ejecuciones en filas; las ejecuciones sin datos generan una sola fila sin etiqueta
+def iter_rows(runs):
+    for run in runs:
+        base = {key: run[key] for key in ("run_id", "timestamp", "simulator", "model", "result")}
+        items = run["data"].items() if run["data"] else [(None, None)]
+        for label, value in items:
+            yield {**base, "label": label, "value": value}
+
+def chunked(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+def write_csv(runs, f):
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="", write_through=True)
+    writer = csv.DictWriter(text, fieldnames=ROW_COLUMNS)
+    writer.writeheader()
+    for chunk in chunked(iter_rows(runs)):
+        writer.writerows(chunk)
+    text.detach()
+
+def write_jsonl(runs, f):
+    for chunk in chunked(runs):
+        f.write("".join(json.dumps(run, ensure_ascii=False) + "\n" for run in chunk).encode("utf-8"))
+
+# Cada bloque se escribe como un row group de Parquet
+def write_parquet(runs, f):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ("run_id", pa.string()), ("timestamp", pa.string()), ("simulator", pa.string()), ("model", pa.string()),
+        ("label", pa.string()), ("value", pa.float64()), ("result", pa.string()),
+    ])
+    with pq.ParquetWriter(f, schema, compression="zstd") as writer:
+        for chunk in chunked(iter_rows(runs)):
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+
+# openpyxl en modo write_only escribe las filas sin mantener la hoja completa en memoria
+def write_xlsx(runs, f):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("La exportación a XLSX requiere el paquete 'openpyxl'.")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Resultados")
+    sheet.append(ROW_COLUMNS)
+    for row in iter_rows(runs):
+        sheet.append([row[column] for column in ROW_COLUMNS])
+    workbook.save(f)
+
+WRITERS = {"CSV": write_csv, "JSONL": write_jsonl, "Parquet": write_parquet, "XLSX": write_xlsx}
+
+# Escribe las ejecuciones en un archivo temporal y devuelve su contenido
+def export_runs(runs, export_format):
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as f:
+        WRITERS[export_format](runs, f)
+        f.seek(0)
+        return f.read()
+
+def export_file_name(prefix, export_format):
+    return f"{prefix}.{EXPORT_FORMATS[export_format][0]}"
+
+# Formato que corresponde a la extensión de un archivo (None si no es ninguna de EXPORT_FORMATS)
+def export_format_for(path):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return next((name for name, (ext, _) in EXPORT_FORMATS.items() if ext == extension), None)
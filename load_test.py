@@ -0,0 +1,331 @@
+# Prueba de carga: levanta el endpoint simulado de OpenRouter y la aplicación con Streamlit, y conduce
+# N sesiones concurrentes sin navegador por el websocket de Streamlit. Cada sesión completa los detalles
+# del producto, elige simuladores, hace clic en "Calcular" y cambia los objetivos. Reporta sesiones por
+# segundo, percentiles de latencia de cada ejecución (del envío hasta script_finished), ejecuciones por
+# sesión (completas y del fragmento del simulador) y CPU/RSS del servidor. Como en el navegador, cambiar un
+# widget fuera de un formulario reejecuta el script (o su fragmento) al momento, así que la misma sesión
+# sirve para comparar versiones de la aplicación con y sin formularios.
+# Uso: python load_test.py --users 20 --duration 60 --latency 1.0
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import requests
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from memory_governor import MB
+from soak_memory import AUDIENCES, PRODUCTS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Campos de los detalles del producto (el resto de los number_input de la página son objetivos)
+DETAIL_LABELS = {"Nombre del producto o servicio", "Audiencia objetivo", "Característica única", "Precio (en USD)", "Localidad"}
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until(check, timeout, what):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except (OSError, requests.RequestException):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{what} no respondió en {timeout} s")
+
+# Inicia el endpoint simulado y la aplicación en procesos propios; devuelve (procesos, url del websocket, pid del servidor)
+def start_servers(app, latency, similarity_cache):
+    mock_port, app_port = free_port(), free_port()
+    mock = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "mock_openrouter.py"), "--port", str(mock_port), "--latency", str(latency)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    env = dict(
+        os.environ, OPENROUTER_API_URL=f"http://127.0.0.1:{mock_port}/api/v1/chat/completions",
+        OPENROUTER_API_KEY="prueba-de-carga", OPENROUTER_MODE="passthrough", SIMILARITY_CACHE="1" if similarity_cache else "0",
+    )
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", os.path.join(HERE, app), "--server.headless", "true",
+            "--server.port", str(app_port), "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+        ],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    processes = [server, mock]
+    try:
+        wait_until(lambda: socket.create_connection(("127.0.0.1", mock_port), timeout=1).close() is None, 15, "El endpoint simulado")
+        wait_until(lambda: requests.get(f"http://127.0.0.1:{app_port}/_stcore/health", timeout=1).ok, 60, "Streamlit")
+    except RuntimeError:
+        stop_servers(processes)
+        raise
+    return processes, f"ws://127.0.0.1:{app_port}/_stcore/stream", server.pid
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+# CPU acumulada (segundos) y RSS (bytes) de un proceso a partir de /proc
+def process_usage(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    with open(f"/proc/{pid}/statm") as f:
+        rss = int(f.read().split()[1]) * PAGE_SIZE
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, rss
+
+async def sample_server(pid, interval, samples, stopped):
+    last_cpu, last_time = process_usage(pid)[0], time.monotonic()
+    while not stopped.is_set():
+        try:
+            await asyncio.wait_for(stopped.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            cpu, rss = process_usage(pid)
+        except OSError:
+            return
+        now = time.monotonic()
+        samples.append({"t": now, "cpu": (cpu - last_cpu) / (now - last_time), "rss": rss})
+        last_cpu, last_time = cpu, now
+
+# Una sesión de navegador simulada: guarda los widgets de la última ejecución y los valores que el
+# usuario cambió, y los reenvía en cada ejecución como lo hace el cliente web
+class VirtualUser:
+    def __init__(self, ws, rng, timeout, results, session=None):
+        self.ws = ws
+        self.rng = rng
+        self.timeout = timeout
+        self.results = results
+        self.session = session
+        self.page_hash = ""
+        self.widgets = {}  # etiqueta -> {"id", "type", "proto", "form_id", "fragment_id"}
+        self.states = {}  # id -> (campo del valor, valor)
+
+    def set_value(self, label, field, value):
+        self.states[self.widgets[label]["id"]] = (field, value)
+
+    # Cambia un widget; fuera de un formulario el cambio reejecuta el script (o su fragmento) como en el
+    # navegador. Devuelve los errores de esa ejecución
+    async def change(self, step, label, field, value):
+        self.set_value(label, field, value)
+        widget = self.widgets[label]
+        if widget["form_id"]:
+            return 0
+        return await self.rerun(step, fragment_id=widget["fragment_id"])
+
+    async def rerun(self, step, trigger=None, fragment_id=""):
+        msg = BackMsg()
+        rerun = msg.rerun_script
+        rerun.query_string = ""
+        rerun.page_script_hash = self.page_hash
+        rerun.fragment_id = fragment_id
+        for widget_id, (field, value) in list(self.states.items()) + ([(trigger, ("trigger_value", True))] if trigger else []):
+            state = rerun.widget_states.widgets.add()
+            state.id = widget_id
+            if field == "string_array_value":
+                state.string_array_value.data.extend(value)
+            else:
+                setattr(state, field, value)
+        if not fragment_id:
+            self.widgets = {}
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        errors = await asyncio.wait_for(self.read_until_finished(), self.timeout)
+        self.results.append({
+            "paso": step, "latencia_ms": (time.perf_counter() - start) * 1000, "errores": errors,
+            "tipo": "fragmento" if fragment_id else "completa", "sesion": self.session,
+        })
+        return errors
+
+    async def read_until_finished(self):
+        errors = 0
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self.ws.recv())
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.page_hash = msg.new_session.page_script_hash
+            elif kind == "script_finished":
+                return errors + (msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR)
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                element_type = element.WhichOneof("type")
+                proto = getattr(element, element_type)
+                if element_type == "exception" or (element_type == "alert" and proto.format == Alert.ERROR):
+                    errors += 1
+                elif getattr(proto, "id", "") and getattr(proto, "label", ""):
+                    self.widgets[proto.label] = {
+                        "id": proto.id, "type": element_type, "proto": proto,
+                        "form_id": getattr(proto, "form_id", ""), "fragment_id": msg.delta.fragment_id,
+                    }
+
+    # Botón "Calcular..." del simulador (botón de envío del formulario o st.button)
+    def calculate_button(self):
+        for label, widget in self.widgets.items():
+            if widget["type"] == "button" and label.startswith("Calcular"):
+                return widget
+        return None
+
+    # Detalles del producto -> (elegir simulador -> Calcular -> cambiar objetivos -> Calcular) x N
+    async def run_session(self, simulators, think):
+        if await self.rerun("inicio"):
+            return False
+        product_name = self.rng.choice(PRODUCTS) + f" {self.rng.randint(1, 50)}"
+        details = [
+            ("Nombre del producto o servicio", "string_value", product_name),
+            ("Audiencia objetivo", "string_value", self.rng.choice(AUDIENCES)),
+            ("Característica única", "string_value", "Sostenibilidad"),
+            ("Precio (en USD)", "double_value", round(self.rng.uniform(1, 100), 2)),
+            ("Localidad", "string_value", self.rng.choice(["México", "Global", "Colombia", "España"])),
+        ]
+        for label, field, value in details:
+            if await self.change("campo", label, field, value):
+                return False
+        await self.pause(think)
+        if "Guardar detalles" in self.widgets and await self.rerun("detalles", self.widgets["Guardar detalles"]["id"]):
+            return False
+        options = list(self.widgets["Selecciona un Simulador"]["proto"].options)
+        for _ in range(simulators):
+            self.set_value("Selecciona un Simulador", "string_value", self.rng.choice(options))
+            await self.pause(think)
+            if await self.rerun("simulador"):
+                return False
+            button = self.calculate_button()
+            if button is None:
+                return False
+            await self.pause(think)
+            if await self.rerun("calcular", button["id"], button["fragment_id"]):
+                return False
+            goals = [
+                (label, widget) for label, widget in self.widgets.items()
+                if widget["type"] == "number_input" and widget["form_id"] == button["form_id"] and label not in DETAIL_LABELS
+            ]
+            for label, widget in goals:
+                if await self.change("campo", label, "double_value", self.new_goal(widget["proto"])):
+                    return False
+            await self.pause(think)
+            button = self.calculate_button()
+            if await self.rerun("objetivo", button["id"], button["fragment_id"]):
+                return False
+        return True
+
+    # Objetivo entre la mitad y el doble del valor por defecto, dentro de los límites del widget
+    def new_goal(self, proto):
+        value = proto.default * self.rng.uniform(0.5, 2.0) if proto.default else self.rng.uniform(1, 100)
+        if proto.has_min:
+            value = max(value, proto.min)
+        if proto.has_max:
+            value = min(value, proto.max)
+        return float(round(value)) if proto.data_type == proto.INT else round(value, 2)
+
+    async def pause(self, think):
+        if think:
+            await asyncio.sleep(self.rng.uniform(0, 2 * think))
+
+async def user_loop(index, url, args, deadline, results, sessions):
+    rng = random.Random(args.seed + index)
+    await asyncio.sleep(args.ramp_up * index / max(1, args.users))
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        session = f"{index}-{len(sessions)}"
+        ok = False
+        try:
+            async with websockets.connect(url, subprotocols=["streamlit"], max_size=None, open_timeout=args.timeout) as ws:
+                ok = await VirtualUser(ws, rng, args.timeout, results, session).run_session(args.simulators, args.think)
+        except (asyncio.TimeoutError, OSError, websockets.WebSocketException, KeyError):
+            ok = False
+        sessions.append({"usuario": index, "sesion": session, "duracion": time.monotonic() - start, "completa": ok})
+
+def percentiles(values):
+    return {"p50": values.quantile(0.50), "p95": values.quantile(0.95), "p99": values.quantile(0.99), "máx": values.max()}
+
+def report(results, sessions, samples, elapsed):
+    latencies = pd.DataFrame(results, columns=["paso", "latencia_ms", "errores", "tipo", "sesion"])
+    runs = pd.DataFrame(sessions, columns=["usuario", "sesion", "duracion", "completa"])
+    completed = int(runs["completa"].sum())
+    print(f"Sesiones completas: {completed} de {len(runs)} en {elapsed:.1f} s -> {completed / elapsed:.2f} sesiones/s")
+    print(f"Ejecuciones: {len(latencies)} -> {len(latencies) / elapsed:.2f} ejecuciones/s · con errores: {int((latencies['errores'] > 0).sum())}")
+    done = latencies[latencies["sesion"].isin(set(runs.loc[runs["completa"], "sesion"]))]
+    if not done.empty:
+        per_session = done.groupby(["sesion", "tipo"]).size().unstack(fill_value=0).reindex(columns=["completa", "fragmento"], fill_value=0)
+        print(
+            f"Ejecuciones por sesión completa: {per_session.sum(axis=1).mean():.1f} · completas del script "
+            f"{per_session['completa'].mean():.1f} · solo del fragmento del simulador {per_session['fragmento'].mean():.1f}"
+        )
+    if not latencies.empty:
+        table = latencies.groupby("paso", sort=False)["latencia_ms"].apply(lambda values: pd.Series({"n": len(values), **percentiles(values)})).unstack()
+        table.loc["total"] = {"n": len(latencies), **percentiles(latencies["latencia_ms"])}
+        print("\nLatencia por ejecución (ms):")
+        print(table.to_string(float_format=lambda value: f"{value:.0f}"))
+    if samples:
+        usage = pd.DataFrame(samples)
+        print(
+            f"\nServidor: CPU media {usage['cpu'].mean():.0%} · máx {usage['cpu'].max():.0%} (100% = un núcleo) · "
+            f"RSS inicial {usage['rss'].iloc[0] / MB:.0f} MB · máx {usage['rss'].max() / MB:.0f} MB · final {usage['rss'].iloc[-1] / MB:.0f} MB"
+        )
+    return latencies
+
+async def run_load(url, server_pid, args):
+    results, sessions, samples = [], [], []
+    stopped = asyncio.Event()
+    sampler = asyncio.create_task(sample_server(server_pid, args.sample_interval, samples, stopped)) if server_pid else None
+    start = time.monotonic()
+    await asyncio.gather(*(user_loop(i, url, args, start + args.duration, results, sessions) for i in range(args.users)))
+    elapsed = time.monotonic() - start
+    stopped.set()
+    if sampler:
+        await sampler
+    return results, sessions, samples, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones de Streamlit concurrentes")
+    parser.add_argument("--app", default="app.py", help="Script de la aplicación (app.py o mistral.py)")
+    parser.add_argument("--url", help="Websocket de un servidor ya iniciado (ws://host:puerto/_stcore/stream); no se inicia ninguno")
+    parser.add_argument("--server-pid", type=int, help="PID del servidor indicado con --url, para medir CPU/RSS")
+    parser.add_argument("--users", type=int, default=10, help="Sesiones concurrentes")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos durante los que se inician sesiones nuevas")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Segundos para arrancar a todos los usuarios")
+    parser.add_argument("--simulators", type=int, default=2, help="Simuladores que usa cada sesión")
+    parser.add_argument("--think", type=float, default=0.5, help="Pausa media entre acciones (s)")
+    parser.add_argument("--latency", type=float, default=1.0, help="Factor de escala de la latencia del endpoint simulado")
+    parser.add_argument("--similarity-cache", action="store_true", help="Activa la caché por similitud en el servidor")
+    parser.add_argument("--timeout", type=float, default=120, help="Tiempo máximo por ejecución (s)")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Intervalo de medición de CPU/RSS (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="Guarda las latencias de cada ejecución en este CSV")
+    args = parser.parse_args()
+
+    processes = []
+    if args.url:
+        url, server_pid = args.url, args.server_pid
+    else:
+        processes, url, server_pid = start_servers(args.app, args.latency, args.similarity_cache)
+    try:
+        results, sessions, samples, elapsed = asyncio.run(run_load(url, server_pid, args))
+    finally:
+        stop_servers(processes)
+    latencies = report(results, sessions, samples, elapsed)
+    if args.csv:
+        latencies.to_csv(args.csv, index=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# Control de memoria para servidores de larga duración: guarda los objetos de resultado de cada sesión
+# con un tamaño aproximado, aplica presupuestos por sesión y por proceso con desalojo LRU, y descarta
+# las sesiones inactivas. Incluye utilidades de diagnóstico (RSS y tracemalloc).
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+MB = 1024 * 1024
+
+SESSION_BUDGET = int(float(os.environ.get("MEMORY_SESSION_BUDGET_MB", 5)) * MB)
+PROCESS_BUDGET = int(float(os.environ.get("MEMORY_PROCESS_BUDGET_MB", 200)) * MB)
+SESSION_TTL = float(os.environ.get("SESSION_TTL_SECONDS", 3600))
+
+# Tamaño aproximado en bytes, recorriendo contenedores; DataFrames, arreglos y figuras con su propio cálculo
+def approx_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes) + sys.getsizeof(obj)
+    if hasattr(obj, "to_plotly_json"):
+        return approx_size(obj.to_plotly_json(), seen)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, seen) for item in obj)
+    return size
+
+# Reloj manual para simulaciones y pruebas del MemoryGovernor: el tiempo solo avanza al cambiar now
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class MemoryGovernor:
+    def __init__(self, session_budget=SESSION_BUDGET, process_budget=PROCESS_BUDGET, session_ttl=SESSION_TTL, clock=time.monotonic):
+        self.session_budget = session_budget
+        self.process_budget = process_budget
+        self.session_ttl = session_ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        # id de sesión -> {"items": OrderedDict(clave -> (objeto, bytes)), "bytes": int, "last_seen": float};
+        # las sesiones se ordenan de menos a más recientemente usadas
+        self.sessions = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.expired_sessions = 0
+
+    def _session(self, session_id, now):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = {"items": OrderedDict(), "bytes": 0, "last_seen": now}
+        session["last_seen"] = now
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def _evict(self, session_id):
+        session = self.sessions[session_id]
+        _, (_, size) = session["items"].popitem(last=False)
+        session["bytes"] -= size
+        self.total_bytes -= size
+        self.evictions += 1
+        if not session["items"]:
+            del self.sessions[session_id]
+
+    def _sweep(self, now):
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session["last_seen"] <= self.session_ttl:
+                break
+            self.total_bytes -= session["bytes"]
+            del self.sessions[session_id]
+            self.expired_sessions += 1
+
+    # Guarda un objeto en la sesión; primero desaloja lo más antiguo de la sesión y luego del proceso
+    def add(self, session_id, key, obj):
+        size = approx_size(obj)
+        with self.lock:
+            now = self.clock()
+            self._sweep(now)
+            session = self._session(session_id, now)
+            if key in session["items"]:
+                old_size = session["items"].pop(key)[1]
+                session["bytes"] -= old_size
+                self.total_bytes -= old_size
+            session["items"][key] = (obj, size)
+            session["bytes"] += size
+            self.total_bytes += size
+            while session["bytes"] > self.session_budget and len(session["items"]) > 1:
+                self._evict(session_id)
+            while self.total_bytes > self.process_budget and self.sessions:
+                oldest_id = next(iter(self.sessions))
+                if oldest_id == session_id and len(session["items"]) == 1:
+                    break
+                self._evict(oldest_id)
+
+    # Objetos de la sesión en orden de inserción (marca la sesión como activa)
+    def items(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return []
+            session["last_seen"] = self.clock()
+            self.sessions.move_to_end(session_id)
+            return [obj for obj, _ in session["items"].values()]
+
+    def sweep(self):
+        with self.lock:
+            self._sweep(self.clock())
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sesiones": len(self.sessions),
+                "objetos": sum(len(session["items"]) for session in self.sessions.values()),
+                "bytes": self.total_bytes,
+                "desalojos": self.evictions,
+                "sesiones_expiradas": self.expired_sessions,
+            }
+
+# Memoria residente actual del proceso en bytes (Linux); None si no está disponible
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+# Principales asignaciones de memoria por línea según tracemalloc (requiere tracemalloc activo)
+def top_allocations(limit=15):
+    if not tracemalloc.is_tracing():
+        return None
+    stats = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ]).statistics("lineno")
+    return [
+        {"ubicación": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "KB": stat.size / 1024, "bloques": stat.count}
+        for stat in stats[:limit]
+    ]
@@ -0,0 +1,99 @@
+# Servidor local que imita el endpoint de chat de OpenRouter para pruebas sin red ni clave API.
+# Uso: python mock_openrouter.py --port 8765 --latency 0.5
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Perfiles por modelo: latencia base (s), variación y probabilidad de responder sin cifras
+MODEL_PROFILES = {
+    "qwen/qwq-32b:free": {"latency": 1.0, "jitter": 0.5, "no_numbers": 0.15, "noise": 0.25},
+    "mistralai/mistral-small-3.1-24b-instruct:free": {"latency": 0.4, "jitter": 0.2, "no_numbers": 0.05, "noise": 0.10},
+}
+DEFAULT_PROFILE = {"latency": 0.5, "jitter": 0.2, "no_numbers": 0.1, "noise": 0.15}
+
+CHANNELS = ["Redes Sociales", "Google Ads", "Email Marketing", "Eventos", "Influencers", "Alianzas locales"]
+
+def prompt_text(payload):
+    content = payload["messages"][-1]["content"]
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content)
+    return content
+
+# Genera una respuesta plausible en español con algunas líneas "Etiqueta: número"
+def fake_answer(prompt, profile, rng):
+    if rng.random() < profile["no_numbers"]:
+        return "Recomiendo una estrategia equilibrada centrada en la propuesta de valor del producto y en la audiencia objetivo."
+    channels = rng.sample(CHANNELS, 4)
+    base = 1000
+    lines = ["Estas son las estimaciones recomendadas:"]
+    for channel in channels:
+        value = base * (1 + rng.uniform(-profile["noise"], profile["noise"]))
+        lines.append(f"{channel}: ${value:.0f} por {rng.randint(2, 8)} semanas" if "semanas" in prompt else f"{channel}: {value:.0f}")
+        base = base * 0.7
+    lines.append("Ajusta los valores según los resultados de las primeras semanas.")
+    return "\n".join(lines)
+
+def build_response(payload, latency_scale=1.0):
+    model = payload.get("model", "")
+    profile = MODEL_PROFILES.get(model, DEFAULT_PROFILE)
+    prompt = prompt_text(payload)
+    rng = random.Random()
+    time.sleep(max(0.0, (profile["latency"] + rng.uniform(-profile["jitter"], profile["jitter"])) * latency_scale))
+    content = fake_answer(prompt, profile, rng)
+    prompt_tokens = len(prompt.split())
+    completion_tokens = len(content.split())
+    return {
+        "id": f"mock-{rng.getrandbits(32):08x}",
+        "model": model,
+        "choices": [{"message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+class MockHandler(BaseHTTPRequestHandler):
+    latency_scale = 1.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length))
+            body = json.dumps(build_response(payload, self.latency_scale)).encode("utf-8")
+            self.send_response(200)
+        except (ValueError, KeyError, IndexError):
+            body = json.dumps({"error": {"message": "Solicitud no válida"}}).encode("utf-8")
+            self.send_response(400)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# Con la cola de conexiones por defecto (5), varios clientes concurrentes desbordan el listen() y las
+# conexiones rechazadas se reintentan un segundo después (retransmisión del SYN), lo que distorsiona
+# las latencias medidas
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+# Inicia el servidor en un hilo y devuelve (servidor, url del endpoint de chat)
+def start_mock_server(port=0, latency_scale=1.0):
+    handler = type("ScaledMockHandler", (MockHandler,), {"latency_scale": latency_scale})
+    server = MockServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Endpoint simulado de OpenRouter")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="Factor de escala de la latencia simulada")
+    args = parser.parse_args()
+    server, url = start_mock_server(args.port, args.latency)
+    print(f"Endpoint simulado en {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,281 @@
+# Cliente mínimo de la API de OpenRouter compartido por las aplicaciones y los scripts
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+import requests
+
+from scheduler import AdmissionError, RequestScheduler, shared_slots
+
+API_URL = os.environ.get("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+# Modelos usados por cada aplicación
+QWEN_MODEL = "qwen/qwq-32b:free"
+MISTRAL_MODEL = "mistralai/mistral-small-3.1-24b-instruct:free"
+
+# Modelos que esperan el contenido del mensaje como lista de partes
+CONTENT_PARTS_MODELS = {MISTRAL_MODEL}
+
+# Modo de transporte: "passthrough" (red), "record" (red + grabación) o "replay" (solo grabación)
+TRANSPORT_MODE = os.environ.get("OPENROUTER_MODE", "passthrough")
+CASSETTE_PATH = os.environ.get("OPENROUTER_CASSETTE", "cassettes/openrouter.jsonl.gz")
+
+# Plazos: tiempo de conexión fijo, tiempo de lectura adaptativo y presupuesto total por petición
+# (el presupuesto cubre reintentos y modelos de respaldo)
+CONNECT_TIMEOUT = 3.05
+REQUEST_BUDGET = float(os.environ.get("OPENROUTER_REQUEST_BUDGET", 90))
+MIN_READ_TIMEOUT = 5.0
+MAX_READ_TIMEOUT = 75.0
+DEFAULT_READ_TIMEOUTS = {QWEN_MODEL: 45.0, MISTRAL_MODEL: 15.0}
+DEFAULT_READ_TIMEOUT = 20.0
+MAX_RETRIES = 1
+
+# Modelos de respaldo a probar, en orden, cuando el principal falla o excede su plazo
+FALLBACK_MODELS = {QWEN_MODEL: [MISTRAL_MODEL]}
+
+class CassetteMissError(LookupError):
+    """No hay respuesta grabada para la petición en modo replay."""
+
+# Error estructurado de la API; kind es "timeout", "connection", "http", "invalid_response",
+# "replay", "deadline", "queue_full", "queue_timeout" o "config" (modo de transporte desconocido)
+class OpenRouterError(Exception):
+    def __init__(self, kind, message, model=None, elapsed=None, attempts=0, status=None):
+        super().__init__(message)
+        self.kind = kind
+        self.model = model
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.status = status
+
+    @property
+    def retryable(self):
+        return self.kind in ("timeout", "connection") or (self.kind == "http" and (self.status == 429 or (self.status or 0) >= 500))
+
+class DeadlineExceededError(OpenRouterError):
+    pass
+
+# Clave de latencia de las llamadas cortas de un simulador (kind "parte" para las partes de un plan,
+# "reask" para las re-consultas de cifras), que se registran aparte de las generaciones completas
+def latency_key(simulator, kind):
+    return f"{simulator or ''}/{kind}"
+
+# Latencias recientes por (modelo, simulador); el plazo de lectura sale del percentil 95. El grupo del
+# modelo (simulador None), que se usa mientras un simulador tiene pocas muestras, solo recibe las
+# generaciones completas
+class LatencyTracker:
+    def __init__(self, window=200, min_samples=5, percentile=0.95, margin=1.5):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile_q = percentile
+        self.margin = margin
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, model, simulator, seconds):
+        keys = [(model, simulator)]
+        if simulator is not None and "/" not in simulator:
+            keys.append((model, None))
+        with self.lock:
+            for key in keys:
+                self.samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model, simulator=None, q=None):
+        q = self.percentile_q if q is None else q
+        with self.lock:
+            values = self.samples.get((model, simulator), ())
+            if len(values) < self.min_samples:
+                values = self.samples.get((model, None), ())
+            if len(values) < self.min_samples:
+                return None
+            values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    # Con pocas muestras se usa el plazo por defecto del modelo
+    def read_timeout(self, model, simulator=None):
+        p = self.percentile(model, simulator)
+        if p is None:
+            return DEFAULT_READ_TIMEOUTS.get(model, DEFAULT_READ_TIMEOUT)
+        return min(MAX_READ_TIMEOUT, max(MIN_READ_TIMEOUT, p * self.margin))
+
+LATENCY = LatencyTracker()
+
+# Turnos de las peticiones del proceso, con los cupos de la cuota compartidos entre procesos (ver scheduler.py)
+SCHEDULER = RequestScheduler(shared=shared_slots())
+
+# Transporte directo por HTTP
+class PassthroughTransport:
+    def send(self, api_url, headers, payload, timeout):
+        response = requests.post(api_url, headers=headers, data=json.dumps(payload), timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+# Archivo de pares petición/respuesta en JSON Lines comprimido con gzip, indexado por hash del payload
+class Cassette:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry["response"]
+
+    @staticmethod
+    def key(payload):
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, payload):
+        return self.entries.get(self.key(payload))
+
+    def put(self, payload, response):
+        key = self.key(payload)
+        entry = {"key": key, "model": payload.get("model"), "request": payload, "response": response}
+        with self.lock:
+            self.entries[key] = response
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Cada escritura agrega un miembro gzip; gzip los lee como un único flujo
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+# Envía por la red y graba cada respuesta exitosa
+class RecordingTransport:
+    def __init__(self, cassette, inner=None):
+        self.cassette = cassette
+        self.inner = inner or PassthroughTransport()
+
+    def send(self, api_url, headers, payload, timeout):
+        response = self.inner.send(api_url, headers, payload, timeout)
+        self.cassette.put(payload, response)
+        return response
+
+# Sirve las respuestas grabadas sin tocar la red
+class ReplayTransport:
+    def __init__(self, cassette):
+        self.cassette = cassette
+
+    def send(self, api_url, headers, payload, timeout):
+        response = self.cassette.get(payload)
+        if response is None:
+            raise CassetteMissError(
+                f"No hay respuesta grabada para el modelo '{payload.get('model')}' en '{self.cassette.path}'. "
+                "Graba primero con OPENROUTER_MODE=record."
+            )
+        return response
+
+# Crea el transporte del modo pedido; lanza OpenRouterError si falta la grabación o el modo no existe
+def make_transport(mode=TRANSPORT_MODE, cassette_path=CASSETTE_PATH):
+    if mode == "passthrough":
+        return PassthroughTransport()
+    if mode == "record":
+        return RecordingTransport(Cassette(cassette_path))
+    if mode == "replay":
+        if not os.path.exists(cassette_path):
+            raise OpenRouterError("replay", f"No existe el archivo de grabaciones '{cassette_path}' requerido en modo replay.")
+        return ReplayTransport(Cassette(cassette_path))
+    raise OpenRouterError("config", f"Modo de transporte desconocido: '{mode}' (usa passthrough, record o replay).")
+
+_transport = None
+_transport_lock = threading.Lock()
+
+# Transporte del proceso, creado una sola vez aunque lo pidan varios hilos a la vez (las partes de un plan)
+def get_transport():
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = make_transport()
+    return _transport
+
+def set_transport(transport):
+    global _transport
+    _transport = transport
+
+def build_headers(api_key):
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+def build_payload(prompt, model):
+    content = [{"type": "text", "text": prompt}] if model in CONTENT_PARTS_MODELS else prompt
+    return {
+        "model": model,
+        "messages": [
+            {"role": "user", "content": content}
+        ]
+    }
+
+# Envía la petición y devuelve la respuesta JSON completa (incluye "usage"); lanza excepciones de requests
+def request_completion(prompt, model, api_key, api_url=API_URL, timeout=10):
+    payload = build_payload(prompt, model)
+    return get_transport().send(api_url, build_headers(api_key), payload, timeout)
+
+# Un intento con plazos (conexión, lectura); traduce las excepciones a errores estructurados
+def attempt_completion(prompt, model, api_key, api_url, read_timeout):
+    start = time.monotonic()
+    try:
+        response = request_completion(prompt, model, api_key, api_url, timeout=(CONNECT_TIMEOUT, read_timeout))
+        response["choices"][0]["message"]["content"]  # valida la estructura de la respuesta
+        return response, time.monotonic() - start
+    except requests.exceptions.Timeout as e:
+        kind, message, status = "timeout", f"El modelo no respondió en {read_timeout:.0f} s ({e.__class__.__name__}).", None
+    except requests.exceptions.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        kind, message = "http", f"La API respondió con el estado HTTP {status}."
+    except requests.exceptions.RequestException as e:
+        kind, message, status = "connection", f"Error al conectar con la API: {str(e)}", None
+    except CassetteMissError as e:
+        kind, message, status = "replay", str(e), None
+    except (KeyError, IndexError, TypeError):
+        kind, message, status = "invalid_response", "Respuesta de la API no válida.", None
+    return OpenRouterError(kind, message, model, time.monotonic() - start, status=status), time.monotonic() - start
+
+# Llama a la API con plazos adaptativos, reintentos y modelos de respaldo dentro de un presupuesto
+# total; devuelve (respuesta JSON, modelo usado) o lanza OpenRouterError
+def complete(prompt, model, api_key, simulator=None, api_url=API_URL, budget=REQUEST_BUDGET, fallbacks=None, tracker=LATENCY):
+    start = time.monotonic()
+    deadline = start + budget
+    candidates = [model] + (FALLBACK_MODELS.get(model, []) if fallbacks is None else fallbacks)
+    attempts = 0
+    last_error = None
+    for index, candidate in enumerate(candidates):
+        for _ in range(MAX_RETRIES + 1):
+            read_timeout = min(tracker.read_timeout(candidate, simulator), deadline - time.monotonic() - CONNECT_TIMEOUT)
+            if read_timeout < MIN_READ_TIMEOUT:
+                raise DeadlineExceededError(
+                    "deadline", f"Se agotó el tiempo total de {budget:.0f} s tras {attempts} intento(s).",
+                    candidate, time.monotonic() - start, attempts
+                ) from last_error
+            attempts += 1
+            result, elapsed = attempt_completion(prompt, candidate, api_key, api_url, read_timeout)
+            if not isinstance(result, OpenRouterError):
+                tracker.record(candidate, simulator, elapsed)
+                return result, candidate
+            last_error = result
+            last_error.attempts = attempts
+            if last_error.kind == "timeout":
+                # Un plazo agotado es una cota inferior de la latencia real; se registra para subir el percentil
+                tracker.record(candidate, simulator, elapsed)
+            if not last_error.retryable:
+                raise last_error
+            # Tras un plazo agotado se pasa directo al modelo de respaldo: reintentar con el mismo modelo
+            # consumiría el presupuesto que el respaldo necesita para responder
+            if last_error.kind == "timeout" and index < len(candidates) - 1:
+                break
+    last_error.elapsed = time.monotonic() - start
+    raise last_error
+
+# Función para llamar a la API de OpenRouter usando requests; devuelve (texto, modelo que respondió), que
+# puede ser un modelo de respaldo, o lanza OpenRouterError. La petición espera su turno en SCHEDULER según
+# su prioridad y usuario; on_wait(posición, en_cola) recibe la posición en la cola mientras espera
+def call_openrouter(prompt, model, api_key, simulator=None, api_url=API_URL, budget=REQUEST_BUDGET, priority="interactivo", user=None, on_wait=None):
+    try:
+        with SCHEDULER.slot(priority, user, on_wait):
+            response, used_model = complete(prompt, model, api_key, simulator, api_url, budget)
+    except AdmissionError as e:
+        raise OpenRouterError(e.kind, str(e), model, e.waited) from e
+    return response["choices"][0]["message"]["content"], used_model
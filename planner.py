@@ -0,0 +1,103 @@
+# Modo por partes para planes largos: divide la pregunta de un simulador en sub-prompts por canal
+# o por fase, cada uno con su cuota del presupuesto o del objetivo, los ejecuta en paralelo y combina
+# las respuestas y los datos extraídos en un solo plan.
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from simulators import BUDGET_GOALS, PRODUCT_CONTEXT, extract_data_for_chart, fill_template
+
+# Partes en que se divide cada simulador compatible, con la fracción del total que se asigna a cada
+# una como punto de partida
+PLAN_PARTS = {
+    "Gestión de Presupuesto Total": [
+        ("canales digitales pagados (buscadores, redes sociales, display)", 0.35),
+        ("contenido orgánico, SEO y email marketing", 0.15),
+        ("medios offline (TV, radio, prensa, vallas)", 0.30),
+        ("eventos, alianzas y punto de venta", 0.20),
+    ],
+    "Lanzamiento de Producto": [
+        ("pre-lanzamiento (expectativa y lista de espera)", 0.20),
+        ("semana de lanzamiento", 0.30),
+        ("primeros tres meses después del lanzamiento", 0.50),
+    ],
+}
+
+# Objetivo que se reparte entre las partes de cada simulador y que acota la suma de sus cifras
+PLAN_TOTALS = {"Gestión de Presupuesto Total": "total_budget", "Lanzamiento de Producto": "adoption_goal"}
+
+# Sub-prompt de cada parte: la pregunta acotada a la parte y a su cuota ({share}), con una respuesta
+# corta y graficable
+PART_TEMPLATES = {
+    "Gestión de Presupuesto Total": PRODUCT_CONTEXT + ", dentro de un plan con un presupuesto total de ${total_budget} y un objetivo de {goal_value} {goal_unit}, al área de {part} le corresponden ${share}. ¿Cómo debo distribuir esos ${share} entre los canales de esta área? Sé breve: una línea por canal con el formato 'Canal: $monto', sin superar ${share} en total.",
+    "Lanzamiento de Producto": PRODUCT_CONTEXT + ", dentro de un lanzamiento con un objetivo total de {adoption_goal} unidades vendidas, la fase de {part} debe aportar {share} unidades. ¿Qué plan debo seguir en esta fase? Sé breve: una línea por canal con el formato 'Canal: unidades', sin superar {share} unidades en total.",
+}
+
+# Reparte un total según las fracciones (montos redondeados hacia abajo al centavo, o unidades enteras);
+# la última parte recibe el resto para que la suma sea exacta
+def split_total(total, fractions, integer=False):
+    shares = [math.floor(total * fraction) if integer else math.floor(total * fraction * 100) / 100 for fraction in fractions[:-1]]
+    rest = total - sum(shares)
+    return shares + [int(rest) if integer else round(rest, 2)]
+
+# Devuelve [(parte, cuota, prompt)] para cada parte del simulador
+def part_prompts(simulator, product, **goals):
+    parts = PLAN_PARTS[simulator]
+    integer = simulator not in BUDGET_GOALS
+    shares = split_total(goals[PLAN_TOTALS[simulator]], [fraction for _, fraction in parts], integer)
+    return [
+        (part, share, fill_template(PART_TEMPLATES[simulator], product, part=part, share=f"{share:d}" if integer else f"{share:.2f}", **goals))
+        for (part, _), share in zip(parts, shares)
+    ]
+
+# Suma los valores de cada etiqueta entre las respuestas parciales
+def merge_data(partials):
+    merged = {}
+    for data in partials:
+        for label, value in (data or {}).items():
+            label = label.strip()
+            merged[label] = merged.get(label, 0.0) + value
+    return merged or None
+
+# Escala proporcionalmente los valores si su suma supera el total (redondeando hacia abajo para no
+# excederlo); devuelve (datos, factor)
+def fit_to_total(data, total):
+    current = sum(data.values())
+    if not total or current <= total:
+        return data, 1.0
+    factor = total / current
+    return {label: math.floor(value * factor * 100) / 100 for label, value in data.items()}, factor
+
+# Ejecuta las partes en paralelo con call(prompt) -> texto; devuelve (texto, datos, prompts). Las partes
+# que fallan se informan en el texto y el plan se arma con las demás; si fallan todas se relanza el
+# error de la primera
+def run_plan(simulator, product, call, max_workers=4, **goals):
+    parts = part_prompts(simulator, product, **goals)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(call, prompt) for _, _, prompt in parts]
+    answers, failures = [], []
+    for (part, _, _), future in zip(parts, futures):
+        try:
+            answers.append((part, future.result()))
+        except Exception as e:
+            failures.append((part, e))
+    if not answers:
+        raise failures[0][1]
+    sections = [f"#### {part[0].upper() + part[1:]}\n\n{answer}" for part, answer in answers]
+    if failures:
+        sections.append(
+            "**No se pudieron calcular estas partes:** " + "; ".join(f"{part} ({error})" for part, error in failures) +
+            ". El plan y el gráfico incluyen solo las demás partes."
+        )
+    data = merge_data(extract_data_for_chart(answer) for _, answer in answers)
+    if data:
+        total = goals[PLAN_TOTALS[simulator]]
+        combined = sum(data.values())
+        data, factor = fit_to_total(data, total)
+        if factor < 1.0:
+            limit = f"el presupuesto de ${total:,.2f}" if simulator in BUDGET_GOALS else f"el objetivo de {total:,} unidades"
+            combined = f"${combined:,.2f}" if simulator in BUDGET_GOALS else f"{combined:,.0f} unidades"
+            sections.append(
+                f"**Nota:** las cifras combinadas ({combined}) superaban {limit}; "
+                f"en el gráfico se ajustaron proporcionalmente ({factor:.0%})."
+            )
+    return "\n\n".join(sections), data, [prompt for _, _, prompt in parts]
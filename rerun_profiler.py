@@ -0,0 +1,88 @@
+# Perfilado de cada ejecución del script de Streamlit. Dos modos:
+#   "cprofile": perfilador determinista; el rastro se descarga como archivo pstats (.prof)
+#   "muestreo": un hilo toma muestras de la pila del script; el rastro se descarga como pilas colapsadas
+#               (una línea "marco;marco;marco cuenta", lista para flamegraph.pl o speedscope)
+import cProfile
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_MODES = {"1": "cprofile", "cprofile": "cprofile", "muestreo": "muestreo", "sampling": "muestreo"}
+SAMPLE_INTERVAL = 0.005
+
+# Toma muestras de la pila de un hilo a intervalos fijos
+class StackSampler:
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+# Perfil de una ejecución; stop() devuelve el rastro como diccionario. Desde Python 3.12 cProfile usa
+# sys.monitoring, que admite un solo perfilador activo por proceso: si otra sesión ya está perfilando,
+# enable() lanza ValueError y esta ejecución se perfila por muestreo
+class RerunProfile:
+    def __init__(self, mode, label):
+        self.mode = mode
+        self.label = label
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        if mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+                return
+            except ValueError:
+                self.mode = "muestreo"
+        self.profiler = StackSampler(threading.get_ident())
+        self.profiler.start()
+
+    def stop(self):
+        duration = time.perf_counter() - self.start
+        if self.mode == "cprofile":
+            self.profiler.disable()
+            stats = pstats.Stats(self.profiler)
+            data = marshal.dumps(stats.stats)
+            top = [
+                {"función": pstats.func_std_string(func), "llamadas": nc, "tiempo_propio": tt, "tiempo_acumulado": ct}
+                for func, (_, nc, tt, ct, _) in sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:15]
+            ]
+        else:
+            self.profiler.stop()
+            data = "".join(f"{stack} {count}\n" for stack, count in self.profiler.counts.most_common()).encode("utf-8")
+            leaves = Counter()
+            for stack, count in self.profiler.counts.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaves.values()) or 1
+            top = [{"función": frame, "muestras": count, "porcentaje": count / total} for frame, count in leaves.most_common(15)]
+        return {
+            "timestamp": time.strftime("%H:%M:%S", time.localtime(self.started_at)),
+            "label": self.label, "mode": self.mode, "duration": duration, "data": data, "top": top,
+        }
+
+def trace_file_name(trace):
+    extension = "prof" if trace["mode"] == "cprofile" else "collapsed.txt"
+    return f"perfil-{trace['label']}-{trace['timestamp'].replace(':', '')}.{extension}"
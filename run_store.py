@@ -0,0 +1,242 @@
+# Almacenamiento compacto de ejecuciones para lotes grandes (productos x simuladores x modelos).
+# Los textos (prompt y respuesta) se comprimen uno por uno con un diccionario compartido entrenado con
+# las frases que se repiten entre prompts y respuestas: zstd con 'zstandard' (en requirements.txt) y,
+# en un entorno sin el paquete, zlib con un diccionario predefinido. Los datos numéricos extraídos van en archivos Arrow IPC sin
+# comprimir que se leen con memoria mapeada, así un análisis sobre todas las ejecuciones solo carga las
+# columnas que usa. Estructura del directorio (un solo proceso escribe a la vez):
+#   dictionary.zstd | dictionary.zlib   diccionario compartido
+#   runs-00001.arrow   una fila por ejecución: metadatos y textos comprimidos
+#   rows-00001.arrow   una fila por dato extraído: run_id, timestamp, simulator, model, label, value
+# Uso: python run_store.py DIRECTORIO            (resumen del almacén)
+#      python run_store.py DIRECTORIO --compact  (une las partes y recomprime con el diccionario)
+import argparse
+import glob
+import os
+import re
+import sys
+import zlib
+from collections import Counter
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from exporters import iter_rows, make_run
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TRAIN_MIN_SAMPLES = 100  # textos necesarios para entrenar el diccionario
+ZSTD_DICT_SIZE = 64 * 1024
+ZLIB_DICT_SIZE = 32 * 1024  # ventana máxima de deflate
+
+RUN_SCHEMA = pa.schema([
+    ("run_id", pa.string()), ("timestamp", pa.string()),
+    ("simulator", pa.dictionary(pa.int16(), pa.string())), ("model", pa.dictionary(pa.int16(), pa.string())),
+    ("prompt", pa.binary()), ("result", pa.binary()), ("raw_bytes", pa.int64()),
+])
+ROW_SCHEMA = pa.schema([
+    ("run_id", pa.string()), ("timestamp", pa.string()),
+    ("simulator", pa.dictionary(pa.int16(), pa.string())), ("model", pa.dictionary(pa.int16(), pa.string())),
+    ("label", pa.string()), ("value", pa.float64()),
+])
+
+class ZstdCodec:
+    name = "zstd"
+
+    def __init__(self, dictionary=None):
+        self.dictionary = dictionary
+        zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        self.compressor = zstandard.ZstdCompressor(level=9, dict_data=zdict)
+        self.decompressor = zstandard.ZstdDecompressor(dict_data=zdict)
+
+    @staticmethod
+    def train(samples):
+        return zstandard.train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def decompress(self, data):
+        return self.decompressor.decompress(data)
+
+# deflate crudo con diccionario predefinido (zdict); el diccionario son los fragmentos fijos más frecuentes
+class ZlibCodec:
+    name = "zlib"
+
+    def __init__(self, dictionary=None):
+        self.dictionary = dictionary
+
+    # Quita lo variable (textos entre comillas y números) y se queda con los fragmentos que más bytes
+    # ahorran; deflate alcanza mejor el final del diccionario, así que los mejores van al final
+    @staticmethod
+    def train(samples):
+        counts = Counter()
+        for sample in samples:
+            for segment in re.split(r"'[^']*'|\$?\d[\d.,]*%?", sample.decode("utf-8", "replace")):
+                if len(segment) >= 8:
+                    counts[segment] += 1
+        ranked = sorted((count * len(segment.encode("utf-8")), segment) for segment, count in counts.items() if count > 1)
+        chosen, size = [], 0
+        for _, segment in reversed(ranked):
+            encoded = segment.encode("utf-8")
+            if size + len(encoded) > ZLIB_DICT_SIZE:
+                continue
+            chosen.append(encoded)
+            size += len(encoded)
+        return b"".join(reversed(chosen))
+
+    def compress(self, data):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=self.dictionary) if self.dictionary else zlib.compressobj(9, zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+        decompressor = zlib.decompressobj(-15, zdict=self.dictionary) if self.dictionary else zlib.decompressobj(-15)
+        return decompressor.decompress(data) + decompressor.flush()
+
+CODECS = {"zstd": ZstdCodec, "zlib": ZlibCodec}
+
+def default_codec():
+    return "zstd" if zstandard is not None else "zlib"
+
+# Lee un archivo Arrow IPC con memoria mapeada (sin copiar las columnas a memoria)
+def read_mapped(path, columns=None):
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.select(columns) if columns else table
+
+class RunStore:
+    def __init__(self, path, codec=None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        existing = glob.glob(os.path.join(path, "dictionary.*"))
+        if existing:
+            self.codec_name = existing[0].rsplit(".", 1)[1]
+            with open(existing[0], "rb") as f:
+                dictionary = f.read()
+        else:
+            self.codec_name = codec or default_codec()
+            dictionary = None
+        if self.codec_name == "zstd" and zstandard is None:
+            raise RuntimeError("Este almacén usa zstd; instala el paquete 'zstandard' para leerlo.")
+        self.codec = CODECS[self.codec_name](dictionary)
+
+    def parts(self, kind):
+        return sorted(glob.glob(os.path.join(self.path, f"{kind}-*.arrow")))
+
+    def _train(self, texts):
+        samples = [text for text in texts if text]
+        if self.codec.dictionary or len(samples) < TRAIN_MIN_SAMPLES:
+            return
+        dictionary = CODECS[self.codec_name].train(samples)
+        with open(os.path.join(self.path, f"dictionary.{self.codec_name}"), "wb") as f:
+            f.write(dictionary)
+        self.codec = CODECS[self.codec_name](dictionary)
+
+    # Escribe una parte nueva; las partes se marcan con si usaron el diccionario
+    def _write_part(self, runs):
+        number = len(self.parts("runs")) + 1
+        metadata = {"codec": self.codec_name, "dictionary": "1" if self.codec.dictionary else "0"}
+        prompts = [(run["prompt"] or "").encode("utf-8") for run in runs]
+        results = [(run["result"] or "").encode("utf-8") for run in runs]
+        table = pa.Table.from_pydict({
+            "run_id": [run["run_id"] for run in runs], "timestamp": [run["timestamp"] for run in runs],
+            "simulator": [run["simulator"] for run in runs], "model": [run["model"] for run in runs],
+            "prompt": [self.codec.compress(text) for text in prompts], "result": [self.codec.compress(text) for text in results],
+            "raw_bytes": [len(prompt) + len(result) for prompt, result in zip(prompts, results)],
+        }, schema=RUN_SCHEMA.with_metadata(metadata))
+        rows = pa.Table.from_pylist([{key: row[key] for key in ROW_SCHEMA.names} for row in iter_rows(runs) if row["label"] is not None], schema=ROW_SCHEMA)
+        for kind, part in (("runs", table), ("rows", rows)):
+            with pa.ipc.new_file(os.path.join(self.path, f"{kind}-{number:05d}.arrow"), part.schema) as writer:
+                writer.write_table(part)
+
+    # Agrega ejecuciones (diccionarios de make_run); el diccionario se entrena con el primer lote suficiente
+    def append(self, runs):
+        runs = list(runs)
+        if not runs:
+            return
+        self._train(text.encode("utf-8") for run in runs for text in (run["prompt"], run["result"]) if text)
+        self._write_part(runs)
+
+    # Filas numéricas de todas las partes, solo con las columnas pedidas (opcionalmente de un simulador)
+    def rows(self, columns=None, simulator=None):
+        tables = []
+        for part in self.parts("rows"):
+            table = read_mapped(part, columns if simulator is None or columns is None or "simulator" in columns else columns + ["simulator"])
+            if simulator is not None:
+                table = table.filter(pc.equal(table["simulator"].cast(pa.string()), simulator))
+                if columns is not None:
+                    table = table.select(columns)
+            tables.append(table)
+        if not tables:
+            schema = pa.schema([ROW_SCHEMA.field(name) for name in columns]) if columns else ROW_SCHEMA
+            return schema.empty_table()
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    # Ejecuciones completas (con textos descomprimidos y sus datos), opcionalmente solo algunos run_id
+    def runs(self, run_ids=None):
+        wanted = set(run_ids) if run_ids is not None else None
+        data = {}
+        for row in self.rows(["run_id", "label", "value"]).to_pylist():
+            if wanted is None or row["run_id"] in wanted:
+                data.setdefault(row["run_id"], {})[row["label"]] = row["value"]
+        for part in self.parts("runs"):
+            table = pa.ipc.open_file(pa.memory_map(part)).read_all()
+            metadata = table.schema.metadata or {}
+            codec = self.codec if metadata.get(b"dictionary") == b"1" else CODECS[self.codec_name]()
+            if wanted is not None:
+                table = table.filter(pc.is_in(table["run_id"], pa.array(sorted(wanted), pa.string())))
+            for run in table.to_pylist():
+                yield make_run(
+                    run["run_id"], run["timestamp"], run["simulator"], run["model"],
+                    codec.decompress(run["prompt"]).decode("utf-8"), codec.decompress(run["result"]).decode("utf-8"),
+                    data.get(run["run_id"]),
+                )
+
+    # Une todas las partes en una y recomprime los textos con el diccionario (entrenándolo si falta)
+    def compact(self):
+        old_parts = self.parts("runs") + self.parts("rows")
+        runs = list(self.runs())
+        if not runs:
+            return
+        self._train(text.encode("utf-8") for run in runs for text in (run["prompt"], run["result"]) if text)
+        for part in old_parts:
+            os.replace(part, part + ".old")
+        self._write_part(runs)
+        for part in old_parts:
+            os.remove(part + ".old")
+
+    def stats(self):
+        raw = stored = runs = 0
+        for part in self.parts("runs"):
+            table = read_mapped(part, ["prompt", "result", "raw_bytes"])
+            runs += table.num_rows
+            raw += pc.sum(table["raw_bytes"]).as_py() or 0
+            stored += table["prompt"].nbytes + table["result"].nbytes
+        files = glob.glob(os.path.join(self.path, "*"))
+        return {
+            "ejecuciones": runs, "filas": sum(pa.ipc.open_file(pa.memory_map(part)).read_all().num_rows for part in self.parts("rows")),
+            "partes": len(self.parts("runs")), "codec": self.codec_name, "diccionario_bytes": len(self.codec.dictionary or b""),
+            "textos_bytes": raw, "textos_comprimidos_bytes": stored, "proporcion": stored / raw if raw else None,
+            "disco_bytes": sum(os.path.getsize(f) for f in files),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen y mantenimiento de un almacén de ejecuciones")
+    parser.add_argument("path")
+    parser.add_argument("--compact", action="store_true", help="Une las partes y recomprime con el diccionario")
+    args = parser.parse_args()
+    store = RunStore(args.path)
+    if args.compact:
+        store.compact()
+    for key, value in store.stats().items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    rows = store.rows(["simulator", "value"])
+    if rows.num_rows:
+        rows = rows.set_column(0, "simulator", rows["simulator"].cast(pa.string()))
+        summary = rows.group_by("simulator").aggregate([("value", "count"), ("value", "mean")]).to_pandas()
+        print(summary.sort_values("simulator").to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# Planificador de peticiones al modelo compartido por todo el proceso. Limita las peticiones simultáneas
+# (la cuota del proveedor es una sola) y reparte los turnos por prioridad (interactivo > barrido > lote)
+# y, dentro de cada prioridad, por turnos rotativos entre usuarios, para que un lote grande o un usuario
+# con muchas consultas no deje esperando a los demás. Si la cola está llena la petición se rechaza de
+# inmediato, y mientras espera se informa su posición en lugar de agotar el tiempo en silencio.
+# Entre procesos (la aplicación y un script de lote como evaluate_models.py) la cuota se reparte con
+# cupos compartidos en archivos de bloqueo (ver SharedSlots): el tráfico que no es interactivo nunca
+# ocupa los cupos reservados a las sesiones interactivas.
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # sin flock (Windows) cada proceso solo se limita a sí mismo
+    fcntl = None
+
+PRIORITIES = ("interactivo", "barrido", "lote")
+
+MAX_CONCURRENT = int(os.environ.get("OPENROUTER_MAX_CONCURRENT", 4))
+# Peticiones en espera admitidas y espera máxima por prioridad (None = sin límite)
+QUEUE_LIMITS = {"interactivo": int(os.environ.get("OPENROUTER_MAX_QUEUE", 50)), "barrido": 500, "lote": None}
+QUEUE_TIMEOUTS = {"interactivo": float(os.environ.get("OPENROUTER_QUEUE_TIMEOUT", 120)), "barrido": 900.0, "lote": None}
+# Directorio de los cupos compartidos entre procesos ("" = sin cupos compartidos) y cupos reservados al
+# tráfico interactivo
+SLOTS_DIR = os.environ.get("OPENROUTER_SLOTS_DIR", os.path.join(tempfile.gettempdir(), "openrouter-slots"))
+INTERACTIVE_RESERVE = int(os.environ.get("OPENROUTER_INTERACTIVE_RESERVE", 1))
+
+# La petición no obtuvo turno; kind es "queue_full" o "queue_timeout"
+class AdmissionError(Exception):
+    def __init__(self, kind, message, waited=None):
+        super().__init__(message)
+        self.kind = kind
+        self.waited = waited
+
+class Ticket:
+    def __init__(self, priority, user):
+        self.priority = priority
+        self.user = user
+        self.granted = False
+        self.handle = None  # cupo compartido que ocupa la petición
+
+# Cupos de la cuota compartidos por todos los procesos de la máquina: un archivo de bloqueo por petición
+# simultánea, que la petición mantiene bloqueado (flock) mientras está en curso. El sistema libera el
+# bloqueo si el proceso termina, así un script interrumpido no deja cupos ocupados. Los últimos
+# `reserved` cupos solo los puede tomar el tráfico interactivo
+class SharedSlots:
+    def __init__(self, path, size, reserved=INTERACTIVE_RESERVE):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.paths = [os.path.join(path, f"cupo-{index}.lock") for index in range(size)]
+        self.reserved = max(0, min(reserved, size - 1))
+
+    # Bloquea un cupo libre sin esperar y devuelve su archivo abierto, o None si no hay ninguno
+    def try_acquire(self, priority):
+        usable = self.paths if priority == "interactivo" else self.paths[:len(self.paths) - self.reserved]
+        for path in usable:
+            handle = open(path, "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except BlockingIOError:
+                handle.close()
+        return None
+
+    def release(self, handle):
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+# Cupos compartidos según la configuración (None si están desactivados o no hay flock)
+def shared_slots(size=MAX_CONCURRENT):
+    return SharedSlots(SLOTS_DIR, size) if SLOTS_DIR and fcntl is not None else None
+
+class RequestScheduler:
+    def __init__(self, max_concurrent=MAX_CONCURRENT, queue_limits=QUEUE_LIMITS, queue_timeouts=QUEUE_TIMEOUTS, window=500, clock=time.monotonic, shared=None):
+        self.max_concurrent = max_concurrent
+        self.shared = shared
+        self.queue_limits = dict(queue_limits)
+        self.queue_timeouts = dict(queue_timeouts)
+        self.clock = clock
+        self.condition = threading.Condition()
+        # prioridad -> usuario -> turnos en espera; el primer usuario es el siguiente en la rotación
+        self.queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self.running = 0
+        self.metrics = {
+            priority: {"admitidas": 0, "rechazadas": 0, "vencidas": 0, "cola_max": 0, "waits": deque(maxlen=window)}
+            for priority in PRIORITIES
+        }
+
+    def _depth(self, priority=None):
+        priorities = PRIORITIES if priority is None else (priority,)
+        return sum(len(tickets) for p in priorities for tickets in self.queues[p].values())
+
+    # Turnos en el orden en que se asignarán: por prioridad y, dentro de ella, una vuelta por usuario
+    def _order(self):
+        for priority in PRIORITIES:
+            pending = [list(tickets) for tickets in self.queues[priority].values()]
+            for level in range(max(map(len, pending), default=0)):
+                for tickets in pending:
+                    if level < len(tickets):
+                        yield tickets[level]
+
+    def _position(self, ticket):
+        for index, queued in enumerate(self._order(), start=1):
+            if queued is ticket:
+                return index
+        return 0
+
+    def _peek_next(self):
+        for priority in PRIORITIES:
+            users = self.queues[priority]
+            if users:
+                return next(iter(users.values()))[0]
+        return None
+
+    # Ocupa un cupo compartido para el turno; False si otros procesos ocupan todos los que puede usar
+    def _take_shared(self, ticket):
+        if self.shared is None:
+            return True
+        ticket.handle = self.shared.try_acquire(ticket.priority)
+        return ticket.handle is not None
+
+    def _release_shared(self, ticket):
+        if ticket is not None and ticket.handle is not None:
+            self.shared.release(ticket.handle)
+            ticket.handle = None
+
+    def _pop_next(self):
+        for priority in PRIORITIES:
+            users = self.queues[priority]
+            if users:
+                user, tickets = next(iter(users.items()))
+                ticket = tickets.popleft()
+                del users[user]
+                if tickets:
+                    users[user] = tickets  # el usuario pasa al final de la rotación
+                return ticket
+        return None
+
+    # Asigna turnos mientras haya capacidad en el proceso y cupos compartidos; si el siguiente turno no
+    # consigue cupo, los demás esperan detrás de él (se reintenta en cada poll de los que esperan)
+    def _dispatch(self):
+        while self.running < self.max_concurrent:
+            ticket = self._peek_next()
+            if ticket is None or not self._take_shared(ticket):
+                break
+            self._pop_next()
+            ticket.granted = True
+            self.running += 1
+        self.condition.notify_all()
+
+    def _remove(self, ticket):
+        tickets = self.queues[ticket.priority].get(ticket.user)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self.queues[ticket.priority][ticket.user]
+
+    # Espera un turno y devuelve su Ticket, que se pasa a release(); on_wait(posición, en_cola) se llama al
+    # encolar y cada poll segundos mientras espera
+    def acquire(self, priority="interactivo", user=None, on_wait=None, poll=0.5):
+        start = self.clock()
+        metrics = self.metrics[priority]
+        ticket = Ticket(priority, user)
+        with self.condition:
+            if self.running < self.max_concurrent and not self._depth() and self._take_shared(ticket):
+                ticket.granted = True
+                self.running += 1
+                metrics["admitidas"] += 1
+                metrics["waits"].append(0.0)
+                return ticket
+            limit = self.queue_limits[priority]
+            if limit is not None and self._depth(priority) >= limit:
+                metrics["rechazadas"] += 1
+                raise AdmissionError("queue_full", f"La cola de peticiones está llena ({self._depth()} en espera); intenta de nuevo en unos segundos.")
+            self.queues[priority].setdefault(user, deque()).append(ticket)
+            metrics["cola_max"] = max(metrics["cola_max"], self._depth(priority))
+            position, depth = self._position(ticket), self._depth()
+        timeout = self.queue_timeouts[priority]
+        try:
+            while True:
+                if on_wait:
+                    on_wait(position, depth)
+                with self.condition:
+                    if not ticket.granted:
+                        remaining = None if timeout is None else start + timeout - self.clock()
+                        if remaining is not None and remaining <= 0:
+                            metrics["vencidas"] += 1
+                            raise AdmissionError(
+                                "queue_timeout", f"La petición esperó {timeout:g} s en la cola sin obtener turno (posición {self._position(ticket)} de {self._depth()}).",
+                                self.clock() - start,
+                            )
+                        self.condition.wait(poll if remaining is None else min(poll, remaining))
+                        if not ticket.granted and self.shared is not None:
+                            self._dispatch()  # otro proceso pudo haber liberado un cupo
+                    if ticket.granted:
+                        metrics["admitidas"] += 1
+                        metrics["waits"].append(self.clock() - start)
+                        return ticket
+                    position, depth = self._position(ticket), self._depth()
+        except BaseException:
+            # Vencida o interrumpida (por ejemplo, Streamlit detiene el script): se libera el turno
+            with self.condition:
+                if ticket.granted:
+                    self._release_shared(ticket)
+                    self.running -= 1
+                    self._dispatch()
+                else:
+                    self._remove(ticket)
+            raise
+
+    def release(self, ticket=None):
+        with self.condition:
+            self._release_shared(ticket)
+            self.running -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority="interactivo", user=None, on_wait=None):
+        ticket = self.acquire(priority, user, on_wait)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    # Métricas por prioridad: en cola, usuarios, admitidas, rechazadas, vencidas y percentiles de espera
+    def stats(self):
+        with self.condition:
+            rows = []
+            for priority in PRIORITIES:
+                metrics = self.metrics[priority]
+                waits = sorted(metrics["waits"])
+                rows.append({
+                    "prioridad": priority, "en_cola": self._depth(priority), "usuarios_en_cola": len(self.queues[priority]),
+                    "cola_max": metrics["cola_max"], "admitidas": metrics["admitidas"], "rechazadas": metrics["rechazadas"],
+                    "vencidas": metrics["vencidas"],
+                    "espera_p50": waits[len(waits) // 2] if waits else None,
+                    "espera_p95": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else None,
+                    "espera_max": waits[-1] if waits else None,
+                })
+            shared = self.shared and {"directorio": self.shared.path, "cupos": len(self.shared.paths), "reservados": self.shared.reserved}
+            return {"en_curso": self.running, "capacidad": self.max_concurrent, "compartidos": shared, "prioridades": rows}
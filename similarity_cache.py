@@ -0,0 +1,154 @@
+# Caché de resultados por similitud (opcional). Reutiliza la respuesta de una consulta anterior cuando
+# el simulador, el modelo, el producto, los objetivos numéricos (redondeados) y los demás campos que
+# identifican la consulta coinciden, y la audiencia, la característica y la localidad son
+# suficientemente parecidas según n-gramas de caracteres, sin usar la red. Los números y las negaciones
+# dentro de esos textos ("18-35 años", "sin azúcar") también deben coincidir.
+import math
+import re
+import sys
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from simulators import parse_prompt
+
+# Campos comparados exactamente tras normalizarlos (además de los numéricos): nombres que cambian el
+# sentido de la consulta aunque difieran en un solo carácter ("Competidor X" y "Competidor Y")
+EXACT_FIELDS = {"product_name", "product_category", "price_kind", "goal_unit", "competitor_name", "new_locality"}
+# Listas separadas por comas comparadas como conjuntos (el orden no importa)
+SET_FIELDS = {"platforms_str"}
+
+# Palabras que invierten el sentido de un texto aunque cambien pocos n-gramas
+NEGATIONS = {"sin", "no", "ni", "nunca", "jamas"}
+
+STOPWORDS = {"de", "del", "la", "las", "el", "los", "y", "e", "o", "a", "en", "para", "con", "por", "un", "una"}
+
+# Minúsculas, sin acentos ni signos, sin palabras vacías
+def normalize_text(text):
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = re.findall(r"[a-z0-9]+", text)
+    return " ".join(word for word in words if word not in STOPWORDS)
+
+# Redondea a cifras significativas para que 10.0 y 9.99 caigan en el mismo grupo
+def bucket_number(value, significant=2):
+    if value == 0:
+        return 0.0
+    digits = significant - int(math.floor(math.log10(abs(value)))) - 1
+    return round(value, digits)
+
+# Vector de n-gramas de caracteres con hashing, normalizado (la similitud es el producto punto)
+def embed(text, dim=1024, n=3):
+    vector = np.zeros(dim, dtype=np.float32)
+    padded = f" {text} "
+    for i in range(max(1, len(padded) - n + 1)):
+        vector[zlib.crc32(padded[i:i + n].encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+# Parte de un texto que se compara exactamente: sus números (redondeados) y si tiene una negación
+def text_markers(text, significant=2):
+    words = text.split()
+    return tuple(bucket_number(int(word), significant) for word in words if word.isdigit()), bool(NEGATIONS.intersection(words))
+
+def to_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+class SimilarityCache:
+    def __init__(self, threshold=0.8, max_entries=2000, max_bytes=64 * 1024 * 1024, significant=2, dim=1024):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.significant = significant
+        self.dim = dim
+        self.lock = threading.Lock()
+        # (clave exacta, campos de texto) -> {"vectors": (entradas, campos, dim), "results": [...], "ids": [...]}
+        self.groups = {}
+        self.order = OrderedDict()  # id -> clave exacta, en orden de uso (LRU)
+        self.sizes = {}  # id -> bytes aproximados (vectores + resultado)
+        self.bytes = 0
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    # Separa los campos del prompt en clave exacta y vectores de texto (uno por campo); None si no se reconoce
+    def features(self, model, simulator, prompt):
+        fields = parse_prompt(simulator, prompt)
+        if fields is None:
+            return None
+        exact, texts = [model, simulator], []
+        for name in sorted(fields):
+            value = fields[name]
+            number = to_number(value)
+            if number is not None:
+                exact.append((name, bucket_number(number, self.significant)))
+            elif name in SET_FIELDS:
+                exact.append((name, tuple(sorted({normalize_text(item) for item in value.split(",")} - {""}))))
+            elif name in EXACT_FIELDS:
+                exact.append((name, normalize_text(value)))
+            else:
+                text = normalize_text(value)
+                exact.append((name, text_markers(text, self.significant)))
+                texts.append((name, text))
+        names = tuple(name for name, _ in texts)
+        vectors = np.stack([embed(text, self.dim) for _, text in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+        return (tuple(exact), names), vectors
+
+    # Devuelve (resultado, similitud) de la consulta más parecida por encima del umbral, o None. Si se
+    # indica accept(resultado), un resultado que no lo cumple cuenta como fallo (p. ej. cifras que no
+    # respetan el presupuesto exacto de esta consulta, que se redondeó al mismo grupo)
+    def get(self, model, simulator, prompt, accept=None):
+        features = self.features(model, simulator, prompt)
+        if features is None:
+            return None
+        key, vectors = features
+        with self.lock:
+            group = self.groups.get(key)
+            if group and group["ids"]:
+                # Similitud de una entrada = la menor similitud coseno entre sus campos de texto
+                scores = np.einsum("nfd,fd->nf", group["vectors"], vectors).min(axis=1, initial=1.0)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold and (accept is None or accept(group["results"][best])):
+                    self.hits += 1
+                    self.order.move_to_end(group["ids"][best])
+                    return group["results"][best], float(scores[best])
+            self.misses += 1
+        return None
+
+    def put(self, model, simulator, prompt, result):
+        features = self.features(model, simulator, prompt)
+        if features is None:
+            return
+        key, vectors = features
+        with self.lock:
+            group = self.groups.setdefault(key, {"vectors": np.empty((0,) + vectors.shape, dtype=np.float32), "results": [], "ids": []})
+            entry_id = self.next_id
+            self.next_id += 1
+            group["vectors"] = np.concatenate([group["vectors"], vectors[np.newaxis]])
+            group["results"].append(result)
+            group["ids"].append(entry_id)
+            self.order[entry_id] = key
+            self.sizes[entry_id] = vectors.nbytes + sys.getsizeof(result)
+            self.bytes += self.sizes[entry_id]
+            while len(self.order) > self.max_entries or (self.bytes > self.max_bytes and len(self.order) > 1):
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, key = self.order.popitem(last=False)
+        self.bytes -= self.sizes.pop(entry_id)
+        group = self.groups[key]
+        index = group["ids"].index(entry_id)
+        group["vectors"] = np.delete(group["vectors"], index, axis=0)
+        del group["results"][index]
+        del group["ids"][index]
+        if not group["ids"]:
+            del self.groups[key]
+
+    def __len__(self):
+        return len(self.order)
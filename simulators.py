@@ -0,0 +1,137 @@
+# Lógica compartida por los simuladores: prompts, extracción de datos y metadatos.
+# Este módulo no depende de Streamlit para poder usarse desde scripts de evaluación.
+import re
+
+# Plantillas de prompt por simulador (los campos del producto se completan con build_prompt)
+PROMPT_TEMPLATES = {
+    "Segmentación de Audiencia": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un CPA objetivo de {cpa_goal}, ¿cuáles deberían ser los segmentos de mercado óptimos (edad, intereses, ubicación, comportamiento)? Proporciona datos numéricos si es posible (ejemplo: Edad 18-24: 30%).",
+    "Campañas de Contenido": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de {engagement_goal} interacciones, ¿qué formatos, tonos y calendario de publicación debo usar? Incluye estimaciones numéricas si es posible (ejemplo: Video: 5000 interacciones).",
+    "Precios": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio actual de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de {sales_goal} unidades vendidas, ¿qué estrategia de precios debo emplear? Incluye ejemplos numéricos si es posible (ejemplo: Precio $10: 800 unidades).",
+    "Embudos de Conversión": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dada una tasa de conversión objetivo de {conversion_goal}%, ¿qué tácticas debo usar en cada etapa del embudo? Incluye tasas por etapa si es posible (ejemplo: Conciencia: 50%).",
+    "Crisis de Marca": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un daño máximo aceptable de {damage_goal}% a la reputación, ¿qué respuesta de comunicación debo usar en una crisis?",
+    "SEO y Posicionamiento": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de {traffic_goal} visitas orgánicas mensuales, ¿qué palabras clave y estrategias debo usar? Incluye estimaciones de tráfico por palabra si es posible (ejemplo: 'café sostenible': 20000 visitas).",
+    "Lanzamiento de Producto": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de {adoption_goal} unidades vendidas en el lanzamiento, ¿qué plan debo seguir? Incluye estimaciones por canal si es posible (ejemplo: Redes Sociales: 400 unidades).",
+    "Marketing de Influencers": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de alcance de {reach_goal} personas, ¿qué tipo de influencers debo usar? Incluye estimaciones de alcance por tipo si es posible (ejemplo: Micro-influencers: 100000 personas).",
+    "Inversión en Plataformas Digitales": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de {sales_goal} unidades vendidas y un presupuesto total máximo de ${budget_limit}, ¿cuánto debo invertir y por cuánto tiempo en las siguientes plataformas digitales: {platforms_str}? Proporciona estimaciones numéricas en dólares y tiempo en semanas (ejemplo: Google Ads: $500 por 4 semanas).",
+    "Retención de Clientes": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de retención de {retention_goal}%, ¿qué estrategias debo usar para retener clientes? Incluye estimaciones numéricas si es posible (ejemplo: Programa de lealtad: 20%).",
+    "Publicidad Offline": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de alcance de {reach_goal} personas y un presupuesto máximo de ${budget_limit}, ¿qué estrategia de publicidad offline (TV, radio, vallas, etc.) debo usar? Incluye estimaciones numéricas si es posible (ejemplo: TV: $2000 para 50000 personas).",
+    "Experiencia del Cliente": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de NPS de {satisfaction_goal}, ¿qué mejoras en la experiencia del cliente debo implementar? Incluye estimaciones numéricas si es posible (ejemplo: Chat en vivo: +15 puntos NPS).",
+    "Expansión de Mercado": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad actual '{locality}', dado un objetivo de {sales_goal} unidades vendidas en la nueva localidad '{new_locality}', ¿qué estrategias debo usar para expandir el mercado? Incluye estimaciones numéricas si es posible (ejemplo: Alianzas locales: 300 unidades).",
+    "Gestión de Presupuesto Total": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un presupuesto total de ${total_budget} y un objetivo de {goal_value} {goal_unit}, ¿cómo debo distribuir el presupuesto entre canales digitales y offline? Incluye estimaciones numéricas si es posible (ejemplo: Google Ads: $2000).",
+    "Eventos y Promociones": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de {sales_goal} unidades vendidas y un presupuesto máximo de ${budget_limit}, ¿qué eventos o promociones debo realizar? Incluye estimaciones numéricas si es posible (ejemplo: Feria local: 200 ventas).",
+    "Competencia": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de superar al competidor '{competitor_name}' en un {sales_increase}% de ventas, ¿qué estrategias debo usar? Incluye estimaciones numéricas si es posible (ejemplo: Campaña diferenciadora: +5%).",
+    "Innovación de Producto": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', dado un objetivo de {adoption_goal} unidades adoptadas, ¿qué mejoras o nuevas características debo implementar? Incluye estimaciones numéricas si es posible (ejemplo: Envase ecológico: 300 unidades).",
+    "Lanzamiento sin Presupuesto Digital": "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}', sin presupuesto para invertir en plataformas digitales pagadas, dado un objetivo de {goal_value} {goal_unit}, ¿qué estrategias orgánicas o de bajo costo debo usar para lanzar el producto, darlo a conocer o conseguir suscriptores? Incluye estimaciones numéricas si es posible (ejemplo: Publicaciones en redes sociales: 500 personas alcanzadas).",
+}
+
+# Columnas usadas para graficar los datos extraídos de cada simulador
+CHART_COLUMNS = {
+    "Segmentación de Audiencia": ("Segmento", "Porcentaje"),
+    "Campañas de Contenido": ("Formato", "Interacciones"),
+    "Precios": ("Precio", "Unidades"),
+    "Embudos de Conversión": ("Etapa", "Tasa"),
+    "SEO y Posicionamiento": ("Palabra Clave", "Tráfico"),
+    "Lanzamiento de Producto": ("Canal", "Unidades"),
+    "Marketing de Influencers": ("Tipo de Influencer", "Alcance"),
+    "Inversión en Plataformas Digitales": ("Plataforma", "Inversión"),
+    "Retención de Clientes": ("Estrategia", "Impacto"),
+    "Publicidad Offline": ("Canal", "Alcance"),
+    "Experiencia del Cliente": ("Mejora", "Impacto"),
+    "Expansión de Mercado": ("Estrategia", "Ventas"),
+    "Gestión de Presupuesto Total": ("Canal", "Inversión"),
+    "Eventos y Promociones": ("Evento", "Ventas"),
+    "Competencia": ("Estrategia", "Incremento"),
+    "Innovación de Producto": ("Innovación", "Adopción"),
+    "Lanzamiento sin Presupuesto Digital": ("Estrategia", "Impacto"),
+}
+
+# Objetivo que actúa como límite de presupuesto en cada simulador cuyas cifras son montos en USD
+BUDGET_GOALS = {"Gestión de Presupuesto Total": "total_budget", "Inversión en Plataformas Digitales": "budget_limit"}
+
+# Simuladores cuyas cifras son porcentajes
+PERCENT_SIMULATORS = {"Segmentación de Audiencia", "Embudos de Conversión"}
+
+# Encabezados de las secciones de cifras que se agregan a una respuesta: las que se vuelven a pedir en
+# formato estricto (ver validation.py) y las reescaladas localmente al cambiar el objetivo (ver
+# estimates.py). Si hay alguna, los datos se extraen solo de la última
+NUMBERS_HEADING = "#### Cifras verificadas"
+ESTIMATE_HEADING = "#### Cifras estimadas"
+
+def numbers_section(text):
+    return re.split(f"{re.escape(NUMBERS_HEADING)}|{re.escape(ESTIMATE_HEADING)}", text)[-1]
+
+# Objetivos por defecto de cada simulador (los mismos valores iniciales de la interfaz)
+DEFAULT_GOALS = {
+    "Segmentación de Audiencia": {"cpa_goal": 10.0},
+    "Campañas de Contenido": {"engagement_goal": 10000},
+    "Precios": {"sales_goal": 1000},
+    "Embudos de Conversión": {"conversion_goal": 5.0},
+    "Crisis de Marca": {"damage_goal": 10.0},
+    "SEO y Posicionamiento": {"traffic_goal": 50000},
+    "Lanzamiento de Producto": {"adoption_goal": 1000},
+    "Marketing de Influencers": {"reach_goal": 500000},
+    "Inversión en Plataformas Digitales": {"sales_goal": 1000, "budget_limit": 5000.0, "platforms_str": "Google Ads, Facebook, Instagram"},
+    "Retención de Clientes": {"retention_goal": 80.0},
+    "Publicidad Offline": {"reach_goal": 100000, "budget_limit": 5000.0},
+    "Experiencia del Cliente": {"satisfaction_goal": 50},
+    "Expansión de Mercado": {"sales_goal": 1000, "new_locality": "España"},
+    "Gestión de Presupuesto Total": {"total_budget": 10000.0, "goal_value": 5000, "goal_unit": "ventas"},
+    "Eventos y Promociones": {"sales_goal": 500, "budget_limit": 2000.0},
+    "Competencia": {"competitor_name": "Competidor X", "sales_increase": 10.0},
+    "Innovación de Producto": {"adoption_goal": 1000},
+    "Lanzamiento sin Presupuesto Digital": {"goal_value": 1000, "goal_unit": "conciencia"},
+}
+
+# Descripción del producto con que empiezan las plantillas, para armar prompts derivados (ver planner.py)
+PRODUCT_CONTEXT = "Para un producto '{product_name}' en la categoría '{product_category}', dirigido a '{target_audience}' con la característica única '{unique_feature}', con un precio de ${price} ({price_kind}) y en la localidad '{locality}'"
+
+# Completa una plantilla con los detalles del producto y los demás valores
+def fill_template(template, product, **values):
+    price_kind = "suscripción mensual" if product["product_category"] == "Tecnología" else "precio unitario"
+    return template.format(price_kind=price_kind, **product, **values)
+
+# Construye el prompt de un simulador a partir de los detalles del producto y sus objetivos
+def build_prompt(simulator, product, **goals):
+    return fill_template(PROMPT_TEMPLATES[simulator], product, **goals)
+
+# Recupera los valores con que se construyó un prompt (inverso de build_prompt); None si no coincide
+def parse_prompt(simulator, prompt):
+    template = PROMPT_TEMPLATES[simulator]
+    pattern = "".join(
+        f"(?P<{part[1:-1]}>.*?)" if re.fullmatch(r"\{\w+\}", part) else re.escape(part)
+        for part in re.split(r"(\{\w+\})", template) if part
+    )
+    match = re.fullmatch(pattern, prompt, re.DOTALL)
+    return match.groupdict() if match else None
+
+# Función para extraer datos numéricos para gráficos (devuelve un diccionario)
+def extract_data_for_chart(text):
+    data = {}
+    lines = numbers_section(text).split("\n")
+    for line in lines:
+        match = re.search(r"(\w+[\w\s]*):\s*\$?(\d+\.?\d*)", line)
+        if match:
+            data[match.group(1)] = float(match.group(2))
+    return data if data else None
+
+# Función para extraer datos para tabla y gráfico (devuelve una lista de diccionarios)
+def extract_data_for_table_and_chart(text):
+    data = []
+    lines = numbers_section(text).split("\n")
+    for line in lines:
+        match = re.search(r"(\w+[\w\s]*):\s*\$?(\d+\.?\d*)\s*(?:por\s*(\d+\.?\d*)\s*semanas)?", line)
+        if match:
+            platform = match.group(1).strip()
+            investment = float(match.group(2))
+            weeks = float(match.group(3)) if match.group(3) else None
+            data.append({"Plataforma": platform, "Inversión": investment, "Semanas": weeks})
+    return data if data else None
+
+# Extrae los datos de un resultado con el extractor que usa cada simulador (None si no grafica)
+def extract_for_simulator(simulator, text):
+    if simulator not in CHART_COLUMNS:
+        return None
+    if simulator == "Inversión en Plataformas Digitales":
+        rows = extract_data_for_table_and_chart(text)
+        return {row["Plataforma"]: row["Inversión"] for row in rows} if rows else None
+    return extract_data_for_chart(text)
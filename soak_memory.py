@@ -0,0 +1,79 @@
+# Prueba de resistencia de memoria: simula miles de sesiones que ejecutan simuladores, guardan su
+# historial en el MemoryGovernor, construyen DataFrames y figuras como la interfaz y usan la caché por
+# similitud. Reporta el RSS del proceso a lo largo de la prueba y falla si sigue creciendo tras el
+# calentamiento.
+# Uso: python soak_memory.py --sessions 3000
+import argparse
+import gc
+import random
+import sys
+
+import pandas as pd
+import plotly.express as px
+
+from exporters import make_run
+from memory_governor import MB, FakeClock, MemoryGovernor, current_rss
+from mock_openrouter import fake_answer, DEFAULT_PROFILE
+from similarity_cache import SimilarityCache
+from simulators import DEFAULT_GOALS, build_prompt, extract_for_simulator
+
+PRODUCTS = ["Café Premium", "App de Finanzas", "Zapatillas Urbanas", "Té Verde", "Curso en Línea", "Cerveza Artesanal"]
+AUDIENCES = ["Jóvenes de 18-35 años", "Profesionales de 25-45 años", "Familias con niños", "Estudiantes universitarios"]
+
+def simulate_session(session_id, governor, cache, rng, figure_rate):
+    product = {
+        "product_name": rng.choice(PRODUCTS) + f" {rng.randint(1, 50)}", "product_category": rng.choice(["Alimentos", "Tecnología", "Moda"]),
+        "target_audience": rng.choice(AUDIENCES), "unique_feature": "Sostenibilidad", "price": round(rng.uniform(1, 100), 2),
+        "locality": rng.choice(["México", "Global", "Colombia", "España"]),
+    }
+    for _ in range(rng.randint(1, 6)):
+        simulator = rng.choice(list(DEFAULT_GOALS))
+        prompt = build_prompt(simulator, product, **DEFAULT_GOALS[simulator])
+        cached = cache.get("mock", simulator, prompt)
+        result = cached[0] if cached else "\n".join(fake_answer(prompt, DEFAULT_PROFILE, rng) for _ in range(rng.randint(2, 8)))
+        if not cached:
+            cache.put("mock", simulator, prompt, result)
+        data = extract_for_simulator(simulator, result)
+        if data:
+            df = pd.DataFrame(list(data.items()), columns=["Etiqueta", "Valor"])
+            # Las figuras de Plotly son lentas de construir; solo se arma una fracción de ellas
+            if rng.random() < figure_rate:
+                px.bar(df, x="Etiqueta", y="Valor").to_json()
+        governor.add(session_id, f"{session_id}-{rng.getrandbits(32)}", make_run(None, None, simulator, "mock", prompt, result, data))
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de resistencia de memoria con sesiones simuladas")
+    parser.add_argument("--sessions", type=int, default=3000)
+    parser.add_argument("--figure-rate", type=float, default=0.02, help="Fracción de ejecuciones que construyen una figura")
+    parser.add_argument("--samples", type=int, default=10, help="Número de mediciones de RSS")
+    parser.add_argument("--process-budget-mb", type=float, default=20)
+    parser.add_argument("--session-ttl", type=float, default=600, help="Segundos simulados de inactividad antes de expirar")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Crecimiento máximo de RSS tras el calentamiento")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    clock = FakeClock()
+    governor = MemoryGovernor(process_budget=int(args.process_budget_mb * MB), session_ttl=args.session_ttl, clock=clock)
+    cache = SimilarityCache(max_bytes=8 * MB)
+    every = max(1, args.sessions // args.samples)
+    rows = []
+    for i in range(args.sessions):
+        clock.now += 1.0  # una sesión nueva por segundo simulado
+        simulate_session(f"s{i}", governor, cache, rng, args.figure_rate)
+        if (i + 1) % every == 0:
+            gc.collect()
+            stats = governor.stats()
+            rows.append({
+                "sesiones_simuladas": i + 1, "rss_mb": current_rss() / MB, "historial_mb": stats["bytes"] / MB,
+                "sesiones_vivas": stats["sesiones"], "cache_mb": cache.bytes / MB, "desalojos": stats["desalojos"],
+                "expiradas": stats["sesiones_expiradas"],
+            })
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.1f}"))
+    warm = report["rss_mb"].iloc[len(report) // 3]
+    growth = report["rss_mb"].iloc[-1] / warm - 1
+    print(f"Crecimiento de RSS tras el calentamiento: {growth:.1%}")
+    return 0 if growth <= args.tolerance else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+# Datos y utilidades compartidos por las pruebas
+import pytest
+
+from memory_governor import FakeClock
+from simulators import DEFAULT_GOALS, build_prompt
+
+PRODUCT = {
+    "product_name": "Café Premium", "product_category": "Alimentos", "target_audience": "Jóvenes",
+    "unique_feature": "Sostenible", "price": 10.0, "locality": "México",
+}
+
+# Prompt del simulador con los objetivos por defecto, salvo los indicados
+def prompt(simulator, product=PRODUCT, **goals):
+    return build_prompt(simulator, product, **{**DEFAULT_GOALS[simulator], **goals})
+
+@pytest.fixture
+def clock():
+    return FakeClock()
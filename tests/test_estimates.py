@@ -0,0 +1,44 @@
+from estimates import EstimateStore
+from simulators import ESTIMATE_HEADING, extract_for_simulator
+
+from conftest import PRODUCT, prompt
+
+def test_local_answer_keeps_recommendation_and_marks_estimate():
+    store = EstimateStore()
+    answer = "Conviene combinar micro y macro influencers con contenido auténtico.\n\nMicro influencers: 300000\nMacro influencers: 200000"
+    first = prompt("Marketing de Influencers", reach_goal=500000)
+    store.record("m", "Marketing de Influencers", first, extract_for_simulator("Marketing de Influencers", answer), answer)
+    text, old_goal = store.local_answer("m", "Marketing de Influencers", prompt("Marketing de Influencers", reach_goal=1000000))
+    assert old_goal == 500000
+    assert text.startswith(answer)
+    assert ESTIMATE_HEADING in text and "estimación" in text
+    assert extract_for_simulator("Marketing de Influencers", text) == {"Micro influencers": 600000.0, "Macro influencers": 400000.0}
+
+def test_local_answer_needs_same_fields_and_recorded_text():
+    store = EstimateStore()
+    simulator = "Eventos y Promociones"
+    store.record("m", simulator, prompt(simulator), {"Feria local": 200.0})
+    assert store.local_answer("m", simulator, prompt(simulator, sales_goal=1000)) is None
+    store.record("m", simulator, prompt(simulator), {"Feria local": 200.0}, "Feria local: 200")
+    assert store.local_answer("m", simulator, prompt(simulator, sales_goal=1000, budget_limit=9000.0)) is None
+    assert store.local_answer("m", simulator, prompt(simulator, sales_goal=1000)) is not None
+
+def test_offline_amounts_are_not_recorded_as_reach():
+    store = EstimateStore()
+    offline = prompt("Publicidad Offline")
+    store.record("m", "Publicidad Offline", offline, {"TV": 2000.0}, "TV: $2000 para 50000 personas")
+    assert len(store) == 0
+    assert store.context("m", "Marketing de Influencers", prompt("Marketing de Influencers")) == ""
+
+def test_byte_cap_evicts_oldest_products():
+    simulator = "Marketing de Influencers"
+    answer = "Micro influencers: 300000\n" + "Recomendación detallada. " * 400
+    store = EstimateStore(max_bytes=30000)
+    named = lambda index, **goals: prompt(simulator, {**PRODUCT, "product_name": f"Café {index}"}, **goals)
+    for index in range(10):
+        store.record("m", simulator, named(index), {"Micro influencers": 300000.0}, answer)
+    assert 0 < len(store) < 10
+    assert store.bytes <= store.max_bytes
+    assert store.bytes == sum(store.sizes.values())
+    assert store.local_answer("m", simulator, named(0, reach_goal=1000000)) is None
+    assert store.local_answer("m", simulator, named(9, reach_goal=1000000)) is not None
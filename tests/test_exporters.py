@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+
+import pyarrow.parquet as pq
+import pytest
+from openpyxl import load_workbook
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from exporters import EXPORT_FORMATS, ROW_COLUMNS, export_format_for, export_runs, make_run
+
+RUNS = [
+    make_run("a1", "2025-01-01T10:00:00", "Precios", "modelo", "prompt 1", "Precio $10: 800", {"Precio $10": 800.0, "Precio $12": 650.0}),
+    make_run("a2", "2025-01-01T10:05:00", "Crisis de Marca", "modelo", "prompt 2", "Sin cifras, ñandú", None),
+]
+
+# Lo mismo que hace Streamlit con la función diferida de st.download_button al hacer clic
+def download(export_format):
+    callable_ = lambda: export_runs(RUNS, export_format)
+    data, _ = convert_data_to_bytes_and_infer_mime(callable_(), unsupported_error=TypeError("tipo no soportado"))
+    return data
+
+@pytest.mark.parametrize("export_format", list(EXPORT_FORMATS))
+def test_deferred_download_returns_bytes(export_format):
+    assert download(export_format)
+
+def test_csv_rows():
+    rows = list(csv.DictReader(io.StringIO(download("CSV").decode("utf-8"))))
+    assert [(row["run_id"], row["label"], row["value"]) for row in rows] == [
+        ("a1", "Precio $10", "800.0"), ("a1", "Precio $12", "650.0"), ("a2", "", ""),
+    ]
+
+def test_jsonl_runs():
+    runs = [json.loads(line) for line in download("JSONL").decode("utf-8").splitlines()]
+    assert runs == RUNS
+
+def test_parquet_rows():
+    table = pq.read_table(io.BytesIO(download("Parquet")))
+    assert table.column_names == ROW_COLUMNS
+    assert table["value"].to_pylist() == [800.0, 650.0, None]
+
+def test_xlsx_rows():
+    sheet = load_workbook(io.BytesIO(download("XLSX")), read_only=True)["Resultados"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == ROW_COLUMNS
+    assert rows[-1][0] == "a2" and rows[-1][-1] == "Sin cifras, ñandú"
+
+def test_export_format_for_path():
+    assert export_format_for("salida/runs.JSONL") == "JSONL"
+    assert export_format_for("runs.xlsx") == "XLSX"
+    assert export_format_for("runs.txt") is None
+    assert export_format_for("parquet") is None
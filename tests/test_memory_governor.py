@@ -0,0 +1,51 @@
+from memory_governor import MemoryGovernor, approx_size
+
+BLOB = "x" * 1000
+SIZE = approx_size(BLOB)
+
+def test_session_budget_evicts_least_recent_item(clock):
+    governor = MemoryGovernor(session_budget=2 * SIZE, process_budget=100 * SIZE, session_ttl=60, clock=clock)
+    for key in "abc":
+        governor.add("s1", key, key * 1000)
+    assert governor.items("s1") == ["b" * 1000, "c" * 1000]
+    assert governor.stats()["desalojos"] == 1
+    assert governor.stats()["bytes"] == 2 * SIZE
+
+def test_replacing_a_key_does_not_count_twice(clock):
+    governor = MemoryGovernor(session_budget=2 * SIZE, process_budget=100 * SIZE, session_ttl=60, clock=clock)
+    governor.add("s1", "a", BLOB)
+    governor.add("s1", "a", BLOB)
+    assert governor.stats() == {"sesiones": 1, "objetos": 1, "bytes": SIZE, "desalojos": 0, "sesiones_expiradas": 0}
+
+def test_process_budget_evicts_from_least_recent_session(clock):
+    governor = MemoryGovernor(session_budget=10 * SIZE, process_budget=3 * SIZE, session_ttl=60, clock=clock)
+    governor.add("s1", "a", BLOB)
+    governor.add("s2", "a", BLOB)
+    governor.add("s1", "b", BLOB)  # s1 pasa a ser la más reciente
+    governor.add("s3", "a", BLOB)
+    assert governor.items("s2") == []
+    assert len(governor.items("s1")) == 2 and len(governor.items("s3")) == 1
+    assert governor.stats()["sesiones"] == 2
+
+def test_single_item_over_budget_is_kept(clock):
+    governor = MemoryGovernor(session_budget=SIZE // 2, process_budget=SIZE // 2, session_ttl=60, clock=clock)
+    governor.add("s1", "a", BLOB)
+    assert governor.items("s1") == [BLOB]
+
+def test_idle_sessions_expire_after_ttl(clock):
+    governor = MemoryGovernor(session_budget=10 * SIZE, process_budget=100 * SIZE, session_ttl=60, clock=clock)
+    governor.add("s1", "a", BLOB)
+    governor.add("s2", "a", BLOB)
+    clock.now = 50
+    governor.items("s1")  # leer también cuenta como actividad
+    clock.now = 60
+    governor.sweep()
+    assert governor.stats()["sesiones"] == 2
+    clock.now = 61
+    governor.sweep()
+    assert governor.items("s2") == [] and governor.items("s1") == [BLOB]
+    assert governor.stats()["sesiones_expiradas"] == 1
+    clock.now = 200
+    governor.add("s3", "a", BLOB)  # add también descarta las sesiones vencidas
+    stats = governor.stats()
+    assert stats["sesiones"] == 1 and stats["sesiones_expiradas"] == 2 and stats["bytes"] == SIZE
@@ -0,0 +1,84 @@
+import pytest
+import requests
+
+import openrouter
+from openrouter import LatencyTracker, latency_key
+
+def test_short_calls_have_their_own_latency_bucket():
+    tracker = LatencyTracker(min_samples=3)
+    for _ in range(5):
+        tracker.record("m", "Precios", 30.0)
+    for _ in range(50):
+        tracker.record("m", latency_key("Precios", "reask"), 1.0)
+        tracker.record("m", latency_key("Precios", "parte"), 2.0)
+    assert tracker.read_timeout("m", "Precios") == 45.0
+    assert tracker.read_timeout("m", latency_key("Precios", "reask")) == openrouter.MIN_READ_TIMEOUT
+    # Un simulador sin muestras usa el grupo del modelo, que solo tiene generaciones completas
+    assert tracker.read_timeout("m", "Competencia") == 45.0
+
+def test_transport_errors_are_structured(tmp_path):
+    for mode, kind in (("replay", "replay"), ("otro", "config")):
+        try:
+            openrouter.make_transport(mode, str(tmp_path / "no-existe.jsonl.gz"))
+        except openrouter.OpenRouterError as e:
+            assert e.kind == kind
+        else:
+            raise AssertionError(f"make_transport({mode!r}) no falló")
+
+def test_transport_is_created_once_across_threads(monkeypatch):
+    import threading
+    import time
+    created = []
+    def slow_make_transport():
+        time.sleep(0.05)
+        created.append(object())
+        return created[-1]
+    monkeypatch.setattr(openrouter, "_transport", None)
+    monkeypatch.setattr(openrouter, "make_transport", slow_make_transport)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(openrouter.get_transport())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1 and all(result is created[0] for result in results)
+
+# Transporte simulado: falla con la excepción dada para los modelos de failing y anota el orden de los intentos
+class FailingTransport:
+    def __init__(self, failing):
+        self.failing = failing
+        self.calls = []
+
+    def send(self, api_url, headers, payload, timeout):
+        model = payload["model"]
+        self.calls.append(model)
+        if model in self.failing:
+            raise self.failing[model]
+        return {"choices": [{"message": {"content": f"respuesta de {model}"}}]}
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(response=response)
+
+def test_call_openrouter_returns_the_model_that_answered(monkeypatch):
+    transport = FailingTransport({openrouter.QWEN_MODEL: http_error(503)})
+    monkeypatch.setattr(openrouter, "_transport", transport)
+    text, model = openrouter.call_openrouter("hola", openrouter.QWEN_MODEL, "clave", user="u")
+    assert (text, model) == (f"respuesta de {openrouter.MISTRAL_MODEL}", openrouter.MISTRAL_MODEL)
+    # Un 503 se reintenta con el mismo modelo antes de pasar al respaldo
+    assert transport.calls == [openrouter.QWEN_MODEL, openrouter.QWEN_MODEL, openrouter.MISTRAL_MODEL]
+    assert openrouter.call_openrouter("hola", openrouter.MISTRAL_MODEL, "clave", user="u")[1] == openrouter.MISTRAL_MODEL
+
+def test_timeout_goes_straight_to_the_fallback(monkeypatch):
+    transport = FailingTransport({openrouter.QWEN_MODEL: requests.exceptions.ReadTimeout()})
+    monkeypatch.setattr(openrouter, "_transport", transport)
+    response, model = openrouter.complete("hola", openrouter.QWEN_MODEL, "clave", tracker=LatencyTracker())
+    assert model == openrouter.MISTRAL_MODEL
+    assert transport.calls == [openrouter.QWEN_MODEL, openrouter.MISTRAL_MODEL]
+    # Sin respaldo, el plazo agotado sí se reintenta con el mismo modelo
+    transport = FailingTransport({"solo": requests.exceptions.ReadTimeout()})
+    monkeypatch.setattr(openrouter, "_transport", transport)
+    with pytest.raises(openrouter.OpenRouterError) as error:
+        openrouter.complete("hola", "solo", "clave", tracker=LatencyTracker())
+    assert error.value.kind == "timeout" and transport.calls == ["solo", "solo"]
@@ -0,0 +1,44 @@
+import pytest
+
+from openrouter import OpenRouterError
+from planner import part_prompts, run_plan, split_total
+
+from conftest import PRODUCT
+BUDGET = {"total_budget": 10000.0, "goal_value": 5000, "goal_unit": "ventas"}
+
+def test_split_total_is_exact():
+    assert split_total(1001, [0.2, 0.3, 0.5], integer=True) == [200, 300, 501]
+    assert sum(split_total(999.99, [0.35, 0.15, 0.3, 0.2])) == pytest.approx(999.99)
+
+def test_each_part_gets_its_share_of_the_budget():
+    parts = part_prompts("Gestión de Presupuesto Total", PRODUCT, **BUDGET)
+    assert [share for _, share, _ in parts] == [3500.0, 1500.0, 3000.0, 2000.0]
+    for part, share, prompt in parts:
+        assert part in prompt and f"${share:.2f}" in prompt
+        assert "¿cómo debo distribuir el presupuesto entre canales digitales y offline?" not in prompt
+
+def test_launch_phases_split_the_goal():
+    parts = part_prompts("Lanzamiento de Producto", PRODUCT, adoption_goal=1000)
+    assert [share for _, share, _ in parts] == [200, 300, 500]
+    assert all(f"aportar {share} unidades" in prompt for _, share, prompt in parts)
+
+def test_failed_parts_are_reported_and_the_rest_is_kept():
+    def call(prompt):
+        if "medios offline" in prompt:
+            raise OpenRouterError("timeout", "El modelo no respondió en 45 s")
+        return "Google Ads: $1000"
+    text, data, prompts = run_plan("Gestión de Presupuesto Total", PRODUCT, call, **BUDGET)
+    assert len(prompts) == 4
+    assert data == {"Google Ads": 3000.0}
+    assert "No se pudieron calcular estas partes:** medios offline" in text and "El modelo no respondió en 45 s" in text
+
+def test_all_parts_failing_raises():
+    def call(prompt):
+        raise OpenRouterError("connection", "sin red")
+    with pytest.raises(OpenRouterError, match="sin red"):
+        run_plan("Lanzamiento de Producto", PRODUCT, call, adoption_goal=1000)
+
+def test_combined_figures_are_scaled_to_the_total_as_a_backstop():
+    text, data, _ = run_plan("Lanzamiento de Producto", PRODUCT, lambda prompt: "Redes Sociales: 600", adoption_goal=1000)
+    assert data == {"Redes Sociales": 1000.0}
+    assert "superaban el objetivo de 1,000 unidades" in text
@@ -0,0 +1,26 @@
+import cProfile
+
+import rerun_profiler
+from rerun_profiler import RerunProfile, trace_file_name
+
+def busy():
+    return sum(i * i for i in range(20000))
+
+def test_cprofile_trace():
+    profile = RerunProfile("cprofile", "script")
+    busy()
+    trace = profile.stop()
+    assert trace["mode"] == "cprofile" and trace["data"] and trace_file_name(trace).endswith(".prof")
+
+# Simula Python 3.12+, donde un segundo perfilador activo en el proceso hace fallar enable()
+class BusyProfile(cProfile.Profile):
+    def enable(self, *args, **kwargs):
+        raise ValueError("Another profiling tool is already active")
+
+def test_falls_back_to_sampling_when_another_profiler_is_active(monkeypatch):
+    monkeypatch.setattr(rerun_profiler.cProfile, "Profile", BusyProfile)
+    profile = RerunProfile("cprofile", "script")
+    busy()
+    trace = profile.stop()
+    assert trace["mode"] == "muestreo"
+    assert trace_file_name(trace).endswith(".collapsed.txt")
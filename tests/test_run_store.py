@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from exporters import make_run
+from run_store import TRAIN_MIN_SAMPLES, RunStore, read_mapped
+
+SIMULATORS = ["Segmentación de Audiencia", "Gestión de Presupuesto Total"]
+
+def make_runs(start, count):
+    return [
+        make_run(
+            f"r{i:04d}", f"2025-01-01T10:{i % 60:02d}:00", SIMULATORS[i % 2], "modelo",
+            f"Para un producto 'Café {i}' en la categoría 'Alimentos', ¿cómo debo distribuir el presupuesto? ({i})",
+            f"Recomiendo combinar canales.\n\nGoogle Ads: ${i * 10}\nTelevisión: ${i * 5}",
+            {"Google Ads": float(i * 10), "Televisión": float(i * 5)},
+        )
+        for i in range(start, start + count)
+    ]
+
+@pytest.fixture(params=["zlib", "zstd"])
+def codec(request):
+    if request.param == "zstd":
+        pytest.importorskip("zstandard")
+    return request.param
+
+def test_round_trip_through_compact(tmp_path, codec):
+    # El primer lote no alcanza para entrenar el diccionario; el segundo sí
+    small, large = make_runs(0, 10), make_runs(10, TRAIN_MIN_SAMPLES)
+    store = RunStore(str(tmp_path), codec)
+    store.append(small)
+    assert not os.path.exists(tmp_path / f"dictionary.{codec}")
+    store.append(large)
+    assert os.path.exists(tmp_path / f"dictionary.{codec}")
+    assert list(store.runs()) == small + large
+
+    store.compact()
+    assert len(store.parts("runs")) == len(store.parts("rows")) == 1
+    assert read_mapped(store.parts("runs")[0]).schema.metadata[b"dictionary"] == b"1"
+    assert not list(tmp_path.glob("*.old"))
+
+    # Un almacén reabierto usa el códec y el diccionario guardados
+    reopened = RunStore(str(tmp_path))
+    assert reopened.codec_name == codec
+    assert list(reopened.runs()) == small + large
+    assert [run["run_id"] for run in reopened.runs(["r0003", "r0050"])] == ["r0003", "r0050"]
+    rows = reopened.rows(["run_id", "value"], simulator=SIMULATORS[1])
+    assert rows.num_rows == len(small) + len(large)  # la mitad de las ejecuciones, dos datos cada una
+    assert rows.column_names == ["run_id", "value"]
+    stats = reopened.stats()
+    assert stats["ejecuciones"] == len(small) + len(large) and stats["partes"] == 1
+    assert stats["textos_comprimidos_bytes"] < stats["textos_bytes"]
+
+def test_compact_empty_store(tmp_path, codec):
+    store = RunStore(str(tmp_path), codec)
+    store.compact()
+    assert store.parts("runs") == [] and list(store.runs()) == []
+    assert store.rows().num_rows == 0
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import PRIORITIES, AdmissionError, RequestScheduler, SharedSlots
+
+UNLIMITED = {priority: None for priority in PRIORITIES}
+
+def wait_for(check, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "la condición no se cumplió a tiempo"
+        time.sleep(0.005)
+
+# Encola una petición en un hilo propio y espera a que quede en la cola; al obtener turno anota su nombre
+def enqueue(scheduler, priority, user, name, order):
+    def run():
+        scheduler.acquire(priority, user, poll=0.01)
+        order.append(name)
+        scheduler.release()
+    depth = scheduler._depth()
+    thread = threading.Thread(target=run)
+    thread.start()
+    wait_for(lambda: scheduler._depth() == depth + 1)
+    return thread
+
+def test_priority_order_and_round_robin_between_users():
+    scheduler = RequestScheduler(max_concurrent=1, queue_limits=UNLIMITED, queue_timeouts=UNLIMITED)
+    scheduler.acquire("interactivo", "ocupado")
+    order = []
+    requests = [
+        ("lote", "a", "lote"), ("barrido", "a", "barrido"),
+        ("interactivo", "u1", "u1-1"), ("interactivo", "u1", "u1-2"), ("interactivo", "u1", "u1-3"),
+        ("interactivo", "u2", "u2-1"), ("interactivo", "u2", "u2-2"),
+    ]
+    threads = [enqueue(scheduler, *request, order) for request in requests]
+    scheduler.release()
+    for thread in threads:
+        thread.join(2)
+    assert order == ["u1-1", "u2-1", "u1-2", "u2-2", "u1-3", "barrido", "lote"]
+    assert scheduler.running == 0 and scheduler._depth() == 0
+
+def test_queue_full_is_rejected_immediately():
+    scheduler = RequestScheduler(max_concurrent=1, queue_limits={**UNLIMITED, "interactivo": 1}, queue_timeouts=UNLIMITED)
+    scheduler.acquire("interactivo", "ocupado")
+    order = []
+    thread = enqueue(scheduler, "interactivo", "u1", "u1", order)
+    with pytest.raises(AdmissionError) as error:
+        scheduler.acquire("interactivo", "u2")
+    assert error.value.kind == "queue_full"
+    # Las demás prioridades tienen su propio límite
+    lote = enqueue(scheduler, "lote", "u3", "lote", order)
+    scheduler.release()
+    thread.join(2)
+    lote.join(2)
+    assert order == ["u1", "lote"]
+    assert scheduler.stats()["prioridades"][0]["rechazadas"] == 1
+
+def test_queue_timeout_leaves_the_queue():
+    scheduler = RequestScheduler(max_concurrent=1, queue_limits=UNLIMITED, queue_timeouts={**UNLIMITED, "interactivo": 0.05})
+    scheduler.acquire("interactivo", "ocupado")
+    with pytest.raises(AdmissionError) as error:
+        scheduler.acquire("interactivo", "u1", poll=0.01)
+    assert error.value.kind == "queue_timeout" and error.value.waited >= 0.05
+    assert scheduler._depth() == 0
+    scheduler.release()
+    scheduler.acquire("interactivo", "u1")
+    assert scheduler.running == 1
+
+class Interrupted(Exception):
+    pass
+
+def test_interrupt_while_queued_removes_the_ticket():
+    scheduler = RequestScheduler(max_concurrent=1, queue_limits=UNLIMITED, queue_timeouts=UNLIMITED)
+    scheduler.acquire("interactivo", "ocupado")
+    def on_wait(position, depth):
+        raise Interrupted()
+    with pytest.raises(Interrupted):
+        scheduler.acquire("interactivo", "u1", on_wait)
+    assert scheduler._depth() == 0 and scheduler.running == 1
+    scheduler.release()
+    assert scheduler.running == 0
+
+def test_interrupt_after_the_turn_was_granted_releases_it():
+    scheduler = RequestScheduler(max_concurrent=1, queue_limits=UNLIMITED, queue_timeouts=UNLIMITED)
+    scheduler.acquire("interactivo", "ocupado")
+    def on_wait(position, depth):
+        scheduler.release()  # el turno pasa a esta petición justo antes de la interrupción
+        raise Interrupted()
+    with pytest.raises(Interrupted):
+        scheduler.acquire("interactivo", "u1", on_wait)
+    assert scheduler.running == 0 and scheduler._depth() == 0
+    with scheduler.slot("interactivo", "u2"):
+        assert scheduler.running == 1
+    assert scheduler.running == 0
+
+def test_shared_slots_reserve_capacity_for_interactive_traffic(tmp_path):
+    # Planificadores con los mismos cupos se comportan como procesos distintos (flock bloquea por archivo abierto)
+    def scheduler(timeouts):
+        return RequestScheduler(max_concurrent=4, queue_limits=UNLIMITED, queue_timeouts=timeouts, shared=SharedSlots(str(tmp_path), 2, reserved=1))
+    batch, app = scheduler(UNLIMITED), scheduler({**UNLIMITED, "lote": 0.05, "interactivo": 0.05})
+    held = batch.acquire("lote", "catalogo")
+    # El único cupo de lote está ocupado por el otro proceso
+    with pytest.raises(AdmissionError) as error:
+        app.acquire("lote", "otro", poll=0.01)
+    assert error.value.kind == "queue_timeout"
+    # El cupo reservado sigue libre para una sesión interactiva, pero solo uno
+    with app.slot("interactivo", "sesion"):
+        with pytest.raises(AdmissionError):
+            app.acquire("interactivo", "otra", poll=0.01)
+    # Cuando el otro proceso libera su cupo, la petición que esperaba lo obtiene en su siguiente sondeo
+    late = scheduler(UNLIMITED)
+    order = []
+    thread = enqueue(late, "lote", "otro", "lote", order)
+    batch.release(held)
+    thread.join(2)
+    assert order == ["lote"] and late.running == 0 and batch.running == 0
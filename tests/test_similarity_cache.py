@@ -0,0 +1,63 @@
+import pytest
+
+from similarity_cache import SimilarityCache
+
+from conftest import PRODUCT, prompt
+
+def cached(simulator, first, second):
+    cache = SimilarityCache()
+    cache.put("m", simulator, first, "resultado")
+    return cache.get("m", simulator, second)
+
+@pytest.mark.parametrize("simulator, first, second", [
+    ("Inversión en Plataformas Digitales", {"platforms_str": "Google Ads, Facebook, Instagram"}, {"platforms_str": "Google Ads, Facebook, Instagram, TikTok"}),
+    ("Competencia", {"competitor_name": "Competidor X"}, {"competitor_name": "Competidor Y"}),
+    ("Expansión de Mercado", {"new_locality": "España"}, {"new_locality": "Estonia"}),
+])
+def test_different_identifying_fields_miss(simulator, first, second):
+    assert cached(simulator, prompt(simulator, **first), prompt(simulator, **second)) is None
+
+def test_different_product_name_misses():
+    other = {**PRODUCT, "product_name": "Café Premium 12"}
+    assert cached("Precios", prompt("Precios"), prompt("Precios", other)) is None
+
+def test_platform_order_and_spacing_do_not_matter():
+    simulator = "Inversión en Plataformas Digitales"
+    hit = cached(simulator, prompt(simulator, platforms_str="Google Ads, Facebook, Instagram"), prompt(simulator, platforms_str="instagram,Facebook , Google Ads"))
+    assert hit is not None
+
+def test_similar_audience_hits_and_rounded_goals_match():
+    first = {**PRODUCT, "target_audience": "Jóvenes de 18-35 años"}
+    other = {**PRODUCT, "target_audience": "Jóvenes de 18 a 35 años"}
+    hit = cached("Precios", prompt("Precios", first, sales_goal=1000), prompt("Precios", other, sales_goal=1004))
+    assert hit is not None and hit[0] == "resultado" and hit[1] >= 0.8
+
+def test_different_audience_misses():
+    other = {**PRODUCT, "target_audience": "Empresas de logística"}
+    assert cached("Precios", prompt("Precios"), prompt("Precios", other)) is None
+
+@pytest.mark.parametrize("field, first, second", [
+    ("target_audience", "Jóvenes de 18-35 años", "Jóvenes de 18-25 años"),
+    ("unique_feature", "Sostenibilidad", "Sin sostenibilidad"),
+    ("locality", "Zona 10 de Guatemala", "Zona 1 de Guatemala"),
+])
+def test_numbers_and_negations_in_texts_miss(field, first, second):
+    assert cached("Precios", prompt("Precios", {**PRODUCT, field: first}), prompt("Precios", {**PRODUCT, field: second})) is None
+
+def test_rejected_result_counts_as_miss():
+    cache = SimilarityCache()
+    cache.put("m", "Precios", prompt("Precios"), "resultado")
+    assert cache.get("m", "Precios", prompt("Precios"), accept=lambda result: False) is None
+    assert cache.get("m", "Precios", prompt("Precios"), accept=lambda result: True) is not None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_bucketed_budget_hit_is_rejected_by_validation():
+    from simulators import extract_for_simulator
+    from validation import answer_problems
+    simulator = "Gestión de Presupuesto Total"
+    cache = SimilarityCache()
+    cache.put("m", simulator, prompt(simulator, total_budget=5049.0), "Google Ads: $3000\nTelevisión: $2049")
+    smaller = prompt(simulator, total_budget=5000.0)
+    accept = lambda result: not answer_problems(simulator, smaller, result, extract_for_simulator(simulator, result))
+    assert cache.get("m", simulator, smaller) is not None
+    assert cache.get("m", simulator, smaller, accept) is None
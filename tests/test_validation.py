@@ -0,0 +1,72 @@
+from simulators import NUMBERS_HEADING
+from validation import validate_and_reask
+
+from conftest import prompt
+
+# Re-consulta simulada que anota los prompts recibidos y responde siempre lo mismo
+def fake_call(reply):
+    prompts = []
+    def call(text):
+        prompts.append(text)
+        return reply
+    call.prompts = prompts
+    return call
+
+def test_valid_answer_does_not_reask():
+    call = fake_call("no debería usarse")
+    answer = "Google Ads: $6000\nTelevisión: $4000"
+    result = validate_and_reask("Gestión de Presupuesto Total", prompt("Gestión de Presupuesto Total"), answer, call)
+    assert result == (answer, {"Google Ads": 6000.0, "Televisión": 4000.0}, [])
+    assert call.prompts == []
+
+def test_over_budget_is_fixed_by_reask():
+    call = fake_call("Google Ads: $6000\nTelevisión: $4000")
+    answer = "Recomiendo invertir fuerte en ambos.\n\nGoogle Ads: $8000\nTelevisión: $5000"
+    text, data, problems = validate_and_reask("Gestión de Presupuesto Total", prompt("Gestión de Presupuesto Total"), answer, call)
+    assert "supera el presupuesto de $10,000.00" in call.prompts[0]
+    assert "no debe superar $10,000.00" in call.prompts[0]
+    assert text.startswith(answer) and NUMBERS_HEADING in text
+    assert data == {"Google Ads": 6000.0, "Televisión": 4000.0}
+    assert problems == []
+
+def test_percentage_over_100_is_fixed_by_reask():
+    call = fake_call("Jóvenes: 60\nAdultos: 40")
+    answer = "Jóvenes: 130\nAdultos: 40"
+    text, data, problems = validate_and_reask("Segmentación de Audiencia", prompt("Segmentación de Audiencia"), answer, call)
+    assert "porcentajes mayores a 100 (Jóvenes)" in call.prompts[0]
+    assert data == {"Jóvenes": 60.0, "Adultos": 40.0}
+    assert problems == []
+
+def test_failed_reask_keeps_original_answer_and_problems():
+    answer = "Google Ads: $8000\nTelevisión: $5000"
+    for reply in ("", "Google Ads: $9000\nTelevisión: $9000"):
+        call = fake_call(reply)
+        text, data, problems = validate_and_reask("Gestión de Presupuesto Total", prompt("Gestión de Presupuesto Total"), answer, call)
+        assert len(call.prompts) == 1
+        assert text == answer
+        assert data == {"Google Ads": 8000.0, "Televisión": 5000.0}
+        assert problems == ["la suma de los montos ($13,000.00) supera el presupuesto de $10,000.00"]
+
+def test_missing_numbers_without_reply():
+    call = fake_call("sigo sin cifras")
+    answer = "Conviene priorizar redes sociales."
+    text, data, problems = validate_and_reask("Gestión de Presupuesto Total", prompt("Gestión de Presupuesto Total"), answer, call)
+    assert text == answer and data is None
+    assert problems == ["no incluye cifras con el formato 'Canal: número'"]
+
+def test_total_lines_are_not_counted_twice():
+    call = fake_call("no debería usarse")
+    for answer in ("Google Ads: $6000\nTelevisión: $4000\nTotal: $10000", "Google Ads: $6000\nSubtotal digital: $6000\nTelevisión: $4000"):
+        text, _, problems = validate_and_reask("Gestión de Presupuesto Total", prompt("Gestión de Presupuesto Total"), answer, call)
+        assert text == answer and problems == []
+    assert call.prompts == []
+
+def test_money_amounts_are_not_percentages():
+    call = fake_call("no debería usarse")
+    answer = "Jóvenes: 60\nAdultos: 40\nPresupuesto mensual: $2500"
+    text, _, problems = validate_and_reask("Segmentación de Audiencia", prompt("Segmentación de Audiencia"), answer, call)
+    assert text == answer and problems == [] and call.prompts == []
+    # Un porcentaje sin signo de dinero sí se sigue revisando
+    call = fake_call("Jóvenes: 60\nAdultos: 40")
+    validate_and_reask("Segmentación de Audiencia", prompt("Segmentación de Audiencia"), "Jóvenes: 250\nAdultos: 40", call)
+    assert len(call.prompts) == 1
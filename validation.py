@@ -0,0 +1,92 @@
+# Validación de las cifras extraídas de cada simulador y re-consulta dirigida. En lugar de repetir la
+# generación completa cuando una respuesta no trae cifras utilizables, se envía una consulta corta con la
+# respuesta anterior como contexto que pide solo los números en formato estricto; esas cifras se agregan
+# a la respuesta bajo NUMBERS_HEADING y son las que se grafican.
+import re
+
+from similarity_cache import to_number
+from simulators import BUDGET_GOALS, CHART_COLUMNS, NUMBERS_HEADING, PERCENT_SIMULATORS, extract_for_simulator, numbers_section, parse_prompt
+
+# Caracteres de la respuesta anterior que se incluyen como contexto en la re-consulta
+REASK_CONTEXT_CHARS = 3000
+
+# Etiquetas de totales y subtotales, que repiten la suma de las demás líneas
+TOTAL_LABEL = re.compile(r"\b(sub\s*)?totale?s?\b|\bsuma\b", re.IGNORECASE)
+
+# Presupuesto máximo del simulador según su prompt (None si no aplica)
+def budget_limit(simulator, prompt):
+    goal = BUDGET_GOALS.get(simulator)
+    fields = parse_prompt(simulator, prompt) if goal else None
+    return to_number(fields[goal]) if fields else None
+
+# Problemas de los datos extraídos (lista vacía si son válidos o si el simulador no grafica)
+def validate(simulator, prompt, data):
+    if simulator not in CHART_COLUMNS:
+        return []
+    label, _ = CHART_COLUMNS[simulator]
+    if not data:
+        return [f"no incluye cifras con el formato '{label}: número'"]
+    problems = []
+    budget = budget_limit(simulator, prompt)
+    total = sum(data.values())
+    if budget and total > budget:
+        problems.append(f"la suma de los montos (${total:,.2f}) supera el presupuesto de ${budget:,.2f}")
+    if simulator in PERCENT_SIMULATORS:
+        over = [name.strip() for name, value in data.items() if value > 100]
+        if over:
+            problems.append(f"hay porcentajes mayores a 100 ({', '.join(over)})")
+    return problems
+
+# Cifras de una respuesta que se validan: sin las líneas de total ni, en los simuladores de porcentajes,
+# los montos en dinero (un presupuesto mencionado en la respuesta no es un porcentaje)
+def figures_to_check(simulator, text, data):
+    if not data:
+        return data
+    section = numbers_section(text)
+    return {
+        label: value for label, value in data.items()
+        if not TOTAL_LABEL.search(label)
+        and not (simulator in PERCENT_SIMULATORS and re.search(re.escape(label) + r":\s*\$", section))
+    }
+
+# Problemas de las cifras extraídas (data) de una respuesta
+def answer_problems(simulator, prompt, text, data):
+    return validate(simulator, prompt, figures_to_check(simulator, text, data))
+
+# Consulta corta que pide solo las cifras en formato estricto, con la respuesta anterior como contexto
+def reask_prompt(simulator, prompt, answer, problems):
+    label, value = CHART_COLUMNS[simulator]
+    if simulator == "Inversión en Plataformas Digitales":
+        line_format = f"'{label}: $monto por N semanas'"
+    elif simulator in BUDGET_GOALS:
+        line_format = f"'{label}: $monto'"
+    elif simulator in PERCENT_SIMULATORS:
+        line_format = f"'{label}: porcentaje' (un número entre 0 y 100, sin el signo %)"
+    else:
+        line_format = f"'{label}: número' ({value.lower()})"
+    rules = [f"Responde solo con una línea por {label.lower()} con el formato {line_format}, sin texto adicional ni separadores de miles."]
+    budget = budget_limit(simulator, prompt)
+    if budget:
+        rules.append(f"La suma de los montos no debe superar ${budget:,.2f}.")
+    rules.append("Usa los mismos nombres y recomendaciones de tu respuesta anterior.")
+    context = answer[:REASK_CONTEXT_CHARS] + ("…" if len(answer) > REASK_CONTEXT_CHARS else "")
+    return f"Tu respuesta anterior fue:\n\n{context}\n\nSus cifras no se pueden usar: {'; '.join(problems)}. " + " ".join(rules)
+
+# Agrega las cifras de la re-consulta a la respuesta original
+def with_numbers(answer, numbers):
+    return f"{answer}\n\n{NUMBERS_HEADING}\n\n{numbers.strip()}"
+
+# Valida la respuesta y, si falla, hace una sola re-consulta con call(prompt) -> texto. Devuelve
+# (respuesta, datos, problemas): la respuesta incluye las cifras verificadas si la re-consulta las corrigió,
+# y problemas es la lista de los que quedaron sin resolver
+def validate_and_reask(simulator, prompt, answer, call):
+    data = extract_for_simulator(simulator, answer)
+    problems = answer_problems(simulator, prompt, answer, data)
+    if not problems:
+        return answer, data, []
+    numbers = call(reask_prompt(simulator, prompt, answer, problems))
+    fixed = with_numbers(answer, numbers)
+    fixed_data = extract_for_simulator(simulator, fixed)
+    if answer_problems(simulator, prompt, fixed, fixed_data):
+        return answer, data, problems
+    return fixed, fixed_data, []